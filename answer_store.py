@@ -0,0 +1,89 @@
+import hashlib
+from typing import Dict, List, Optional
+
+import chromadb
+
+from chroma_text_processing import CustomSentenceTransformerEmbedding, normalize_arabic
+
+
+class AnswerStore:
+    """
+    Store of pre-generated (question, answer) pairs, indexed by question embedding in a ChromaDB
+    collection using cosine distance. The bot checks it before running the full RAG pipeline.
+    """
+    def __init__(self, collection_name: str, persist_directory: str, client=None, embedding_function=None,
+                 similarity_threshold: float = 0.9, normalize: bool = False):
+        """
+        Initializes the AnswerStore.
+
+        Args:
+            collection_name (str): Name of the answers collection (e.g. 'taw_bio_answers').
+            persist_directory (str): Directory where the ChromaDB data is stored.
+            client: Optional existing ChromaDB client to share.
+            embedding_function: Optional existing embedding function to share; must match the one used for lookups.
+            similarity_threshold (float): Minimum cosine similarity for a stored question to count as a match.
+            normalize (bool): Whether questions are embedded after normalize_arabic; must match the
+                `normalize` setting of the ChromaInterface whose query embeddings are passed to `lookup`.
+        """
+        self.client = client or chromadb.PersistentClient(path=persist_directory)
+        self.embedding_function = embedding_function or CustomSentenceTransformerEmbedding()
+        self.collection = self.client.get_or_create_collection(
+            name=collection_name,
+            embedding_function=self.embedding_function,
+            metadata={"hnsw:space": "cosine"}
+        )
+        self.similarity_threshold = similarity_threshold
+        self.normalize = normalize
+
+    @staticmethod
+    def question_id(question: str) -> str:
+        return hashlib.sha1(question.strip().encode('utf-8')).hexdigest()
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def contains(self, question: str) -> bool:
+        return bool(self.collection.get(ids=[self.question_id(question)])["ids"])
+
+    def add(self, questions: List[str], answers: List[str], metadatas: Optional[List[Dict[str, object]]] = None):
+        """
+        Adds (or replaces) question/answer pairs.
+
+        Args:
+            questions (List[str]): The questions; their embeddings are the lookup keys.
+            answers (List[str]): The answer for each question.
+            metadatas (Optional[List[Dict[str, object]]]): Extra metadata per pair (e.g. the source section).
+        """
+        metadatas = metadatas or [{} for _ in questions]
+        # Embed explicitly so the keys are normalised like the queries while the stored text stays as written
+        keys = [normalize_arabic(question) for question in questions] if self.normalize else questions
+        self.collection.upsert(
+            ids=[self.question_id(question) for question in questions],
+            embeddings=self.embedding_function(keys),
+            documents=questions,
+            metadatas=[{**metadata, "answer": answer} for metadata, answer in zip(metadatas, answers)]
+        )
+
+    def lookup(self, query_embedding: List[float]) -> Optional[str]:
+        """
+        Returns the stored answer of the most similar question, if it is similar enough.
+
+        Args:
+            query_embedding (List[float]): Embedding of the user's question (see ChromaInterface.embed_query).
+
+        Returns:
+            Optional[str]: The stored answer, or None if no stored question passes the similarity threshold.
+        """
+        if self.collection.count() == 0:
+            return None
+        results = self.collection.query(
+            query_embeddings=[query_embedding],
+            n_results=1,
+            include=["metadatas", "distances"]
+        )
+        if not results["ids"][0]:
+            return None
+        # Cosine distance is 1 - cosine similarity
+        if 1.0 - results["distances"][0][0] < self.similarity_threshold:
+            return None
+        return results["metadatas"][0][0]["answer"]
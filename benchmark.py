@@ -0,0 +1,238 @@
+import argparse
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+from tracing import Tracer
+
+DEFAULT_QUESTIONS = [
+    "ما هي وظيفة الميتوكوندريا في الخلية؟",
+    "ما الفرق بين الخلية النباتية والخلية الحيوانية؟",
+    "اشرح عملية البناء الضوئي.",
+    "ما هو دور الإنزيمات في جسم الإنسان؟",
+    "كيف يحدث الانقسام المتساوي؟",
+    "ما هي مكونات الدم؟",
+    "ما هو الحمض النووي DNA؟",
+    "كيف تنتقل الصفات الوراثية من الآباء إلى الأبناء؟",
+    "ما هي وظيفة الجهاز المناعي؟",
+    "اشرح تركيب الغشاء البلازمي.",
+]
+
+
+class StubLLMServer:
+    """
+    Local HTTP server that mimics the response shape expected by CustomLLM
+    (a JSON object whose 'body' is a JSON string with 'content' and 'message'),
+    with configurable simulated latency.
+    """
+
+    def __init__(self, latency: float = 0.5, jitter: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        """
+        Args:
+            latency (float): Base response delay in seconds.
+            jitter (float): Extra uniformly distributed delay in seconds, added on top of `latency`.
+            host (str): Interface to bind to.
+            port (int): Port to listen on (0 picks a free port).
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.requests_served = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                time.sleep(stub.latency + random.uniform(0, stub.jitter))
+                with stub._lock:
+                    stub.requests_served += 1
+                prompt = payload.get("prompt", "")
+                body = json.dumps({
+                    "content": f"إجابة تجريبية ({len(prompt)} حرفًا في الطلب)",
+                    "message": "stub response",
+                }, ensure_ascii=False)
+                data = json.dumps({"statusCode": 200, "body": body}).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.url = f"http://{host}:{self.server.server_address[1]}/"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class CollectingTracer(Tracer):
+    """
+    Tracer that keeps finished records in memory so a benchmark can compute percentiles from them.
+    """
+
+    def __init__(self):
+        super().__init__(enabled=True)
+        self.records: List[dict] = []
+
+    def record(self, trace):
+        super().record(trace)
+        with self._lock:
+            self.records.append(trace.to_record())
+
+
+class RecordingSender:
+    """
+    Stands in for telebot.TeleBot when driving TelegramBot.handle_message offline.
+    """
+
+    def __init__(self):
+        self.replies = []
+
+    def reply_to(self, message, text):
+        self.replies.append((message.chat.id, text))
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def make_message(text: str, chat_id: int):
+    """
+    Builds a minimal object with the attributes TelegramBot.handle_message reads from a telebot Message.
+    """
+    return SimpleNamespace(text=text, chat=SimpleNamespace(id=chat_id), date=int(time.time()))
+
+
+def run_benchmark(llm_handler, questions: List[str], total_requests: int = 100, concurrency: int = 4,
+                  bot=None) -> Dict[str, dict]:
+    """
+    Sends `total_requests` questions (cycled from `questions`) through the pipeline and reports latency.
+
+    Args:
+        llm_handler: The LLMHandler to benchmark.
+        questions (List[str]): Questions to send.
+        total_requests (int): Number of requests to send.
+        concurrency (int): Number of requests in flight at once.
+        bot (Optional[TelegramBot]): If given, requests go through its message handler
+            (with replies recorded instead of sent) rather than calling the handler directly.
+
+    Returns:
+        Dict[str, dict]: Per-stage (and 'total') statistics: count, p50, p95, p99 (seconds) and qps.
+    """
+    tracer = CollectingTracer()
+    if bot is not None:
+        bot.tracer = tracer
+        bot.bot = RecordingSender()
+        bot.set_llm_handler(llm_handler)
+
+    def one_request(i: int):
+        question = questions[i % len(questions)]
+        start = time.perf_counter()
+        if bot is not None:
+            bot.handle_message(make_message(question, chat_id=i))
+        else:
+            trace = tracer.start_trace(str(i))
+            try:
+                llm_handler.generate_response(question, trace=trace)
+            except Exception as e:
+                trace.set_error(e)
+            trace.finish()
+        return time.perf_counter() - start
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        totals = list(executor.map(one_request, range(total_requests)))
+    wall_time = time.perf_counter() - wall_start
+
+    stage_values: Dict[str, List[float]] = {"total": totals}
+    errors = 0
+    for record in tracer.records:
+        if record["error"]:
+            errors += 1
+        for name, duration in record["stages"].items():
+            stage_values.setdefault(name, []).append(duration)
+
+    report = {}
+    for name, values in stage_values.items():
+        report[name] = {
+            "count": len(values),
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "p99": percentile(values, 99),
+            # Throughput a stage could sustain at this concurrency if it were the only bottleneck
+            "qps": len(values) / wall_time if name == "total" else concurrency * len(values) / max(sum(values), 1e-9),
+        }
+    report["total"]["errors"] = errors
+    report["total"]["wall_time"] = wall_time
+    return report
+
+
+def format_report(report: Dict[str, dict]) -> str:
+    lines = [f"{'stage':<18}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'qps':>10}"]
+    for name, stats in report.items():
+        lines.append(
+            f"{name:<18}{stats['count']:>7}{stats['p50'] * 1000:>10.1f}{stats['p95'] * 1000:>10.1f}"
+            f"{stats['p99'] * 1000:>10.1f}{stats['qps']:>10.1f}"
+        )
+    total = report.get("total", {})
+    if total:
+        lines.append(f"errors: {total['errors']}, wall time: {total['wall_time']:.2f}s")
+    return "\n".join(lines)
+
+
+def load_questions(path: Optional[str]) -> List[str]:
+    if not path:
+        return DEFAULT_QUESTIONS
+    with open(path, 'r', encoding='utf-8') as file:
+        return [line.strip() for line in file if line.strip()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of the RAG bot pipeline.")
+    parser.add_argument("--collection", default="taw_bio")
+    parser.add_argument("--db-path", default="DB/chroma_db")
+    parser.add_argument("--template", default="detailed_ar")
+    parser.add_argument("--questions", help="File with one question per line (defaults to a built-in Arabic set).")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.5, help="Simulated LLM latency in seconds.")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Extra random LLM latency in seconds.")
+    parser.add_argument("--through-bot", action="store_true", help="Drive TelegramBot's message handler.")
+    args = parser.parse_args()
+
+    from llm import CustomLLM
+    from llm_handler import LLMHandler
+
+    stub = StubLLMServer(latency=args.latency, jitter=args.jitter).start()
+    llm = CustomLLM(stub.url)
+    llm.configure(auth_token="benchmark")
+    handler = LLMHandler(args.collection, args.db_path, llm, template_name=args.template)
+
+    bot = None
+    if args.through_bot:
+        from bot import TelegramBot
+        bot = TelegramBot("0:benchmark")
+
+    try:
+        result = run_benchmark(handler, load_questions(args.questions), args.requests, args.concurrency, bot=bot)
+        print(format_report(result))
+    finally:
+        stub.stop()
@@ -1,9 +1,14 @@
 import telebot
+from tracing import Tracer
 
 class TelegramBot:
-    def __init__(self, token):
+    def __init__(self, token, tracer=None, recorder=None):
         self.bot = telebot.TeleBot(token)
         self.llm_handler = None
+        # Tracing is disabled unless a tracer is passed in
+        self.tracer = tracer or Tracer(enabled=False)
+        # Optional TrafficRecorder logging anonymised messages for load-test replay
+        self.recorder = recorder
 
     def set_llm_handler(self, llm_handler):
         self.llm_handler = llm_handler
@@ -11,19 +16,32 @@ class TelegramBot:
     def start(self):
         @self.bot.message_handler(commands=['start', 'help'])
         def send_welcome(message):
+            # Starting over forgets the previous conversation
+            if self.llm_handler and getattr(self.llm_handler, "memory", None) is not None:
+                self.llm_handler.memory.clear(message.chat.id)
             self.bot.reply_to(message, "Welcome! I'm a bot powered by an LLM. Send me a message, and I'll generate a response.")
 
         @self.bot.message_handler(func=lambda message: True)
         def handle_message(message):
-            if self.llm_handler:
-                try:
-                    response = self.llm_handler.generate_response(message.text)
-                    self.bot.reply_to(message, response)
-                except Exception as e:
-                    self.bot.reply_to(message, f"An error occurred: {str(e)}")
-            else:
-                self.bot.reply_to(message, "LLM handler not set. Unable to process message.")
+            self.handle_message(message)
+
+    def handle_message(self, message):
+        if self.recorder is not None:
+            self.recorder.record(message)
+        if not self.llm_handler:
+            self.bot.reply_to(message, "LLM handler not set. Unable to process message.")
+            return
+
+        trace = self.tracer.start_trace(str(message.chat.id))
+        try:
+            response = self.llm_handler.generate_response(message.text, trace=trace, chat_id=message.chat.id)
+        except Exception as e:
+            trace.set_error(e)
+            response = f"An error occurred: {str(e)}"
+        with trace.stage("telegram_send"):
+            self.bot.reply_to(message, response)
+        trace.finish()
 
     def run(self):
         print("Bot is running...")
-        self.bot.infinity_polling()
\ No newline at end of file
+        self.bot.infinity_polling()
@@ -1,9 +1,15 @@
+import hashlib
+import json
 import os
-from typing import List, Dict, Optional
+import re
+from typing import List, Dict, Optional, Tuple
 import chromadb
+import numpy as np
 from chromadb.utils import embedding_functions
-from sentence_transformers import SentenceTransformer
-from langchain.text_splitter import RecursiveCharacterTextSplitter, NLTKTextSplitter
+from tracing import NULL_TRACE
+
+# sentence_transformers and langchain are heavy imports; they are loaded inside the classes
+# that need them so importing this module (e.g. at bot startup) stays cheap.
 
 # Define a base TextSplitter class
 class TextSplitter:
@@ -27,6 +33,8 @@ class RecursiveCharacterTextSplitterAdapter(TextSplitter):
             chunk_size (int): Maximum size of each chunk.
             chunk_overlap (int): Number of characters to overlap between chunks.
         """
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+
         self.splitter = RecursiveCharacterTextSplitter(
             chunk_size=chunk_size,
             chunk_overlap=chunk_overlap,
@@ -54,6 +62,8 @@ class NLTKTextSplitterAdapter(TextSplitter):
         """
         Initializes the NLTKTextSplitterAdapter.
         """
+        from langchain.text_splitter import NLTKTextSplitter
+
         self.splitter = NLTKTextSplitter()
 
     def split_text(self, text: str) -> List[str]:
@@ -68,6 +78,128 @@ class NLTKTextSplitterAdapter(TextSplitter):
         """
         return self.splitter.split_text(text)
 
+# Arabic normalisation tables: alef/yaa variants are unified, tashkeel (diacritics) and tatweel are removed
+_ARABIC_NORMALISATION = str.maketrans({
+    "أ": "ا",
+    "إ": "ا",
+    "آ": "ا",
+    "ٱ": "ا",
+    "ى": "ي",
+    "ـ": None,  # tatweel
+    **{chr(code): None for code in range(0x064B, 0x0653)},  # tashkeel: fathatan .. sukun
+    "ٰ": None,  # superscript alef
+})
+
+
+def normalize_arabic(text: str) -> str:
+    """
+    Normalises Arabic text for indexing and querying: unifies alef and yaa variants and strips
+    tashkeel and tatweel. Queries must be normalised the same way as the indexed chunks.
+
+    Args:
+        text (str): Text to normalise.
+
+    Returns:
+        str: The normalised text.
+    """
+    return text.translate(_ARABIC_NORMALISATION)
+
+
+class ArabicTextSplitter(TextSplitter):
+    """
+    Native splitter that packs whole sentences into chunks, splitting on Arabic and Latin sentence
+    punctuation (. ! ? ؟ ؛ and line breaks) in a single regex pass, without LangChain.
+
+    Sentences longer than `chunk_size` are cut at the last space or Arabic comma (،) before the limit.
+    Chunk offsets into the original text are available through `split_text_with_offsets`.
+    """
+    _SENTENCE_END = re.compile(r"[.!?؟؛\n]+\s*")
+    _SOFT_BREAK = re.compile(r"[\s،]")
+
+    def __init__(self, chunk_size: int = 400, chunk_overlap: int = 40, normalize: bool = False):
+        """
+        Initializes the ArabicTextSplitter.
+
+        Args:
+            chunk_size (int): Maximum size of each chunk in characters (before normalisation).
+            chunk_overlap (int): Maximum number of characters of trailing sentences repeated at the start of the next chunk.
+            normalize (bool): Whether to apply normalize_arabic to the returned chunks.
+        """
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size.")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.normalize = normalize
+
+    def split_text(self, text: str) -> List[str]:
+        """
+        Splits the given text into chunks of whole sentences.
+
+        Args:
+            text (str): Text to split.
+
+        Returns:
+            List[str]: List of text chunks.
+        """
+        return [chunk for chunk, _, _ in self.split_text_with_offsets(text)]
+
+    def split_text_with_offsets(self, text: str) -> List[Tuple[str, int, int]]:
+        """
+        Splits the given text and reports where each chunk came from.
+
+        Args:
+            text (str): Text to split.
+
+        Returns:
+            List[Tuple[str, int, int]]: (chunk, start, end) triples; `text[start:end]` is the chunk before
+                whitespace trimming and normalisation.
+        """
+        chunks = []
+        sentences = self._sentence_spans(text)
+        i = 0
+        while i < len(sentences):
+            start = sentences[i][0]
+            j = i
+            # Pack as many whole sentences as fit in chunk_size
+            while j + 1 < len(sentences) and sentences[j + 1][1] - start <= self.chunk_size:
+                j += 1
+            end = sentences[j][1]
+            chunk = text[start:end].strip()
+            if chunk:
+                chunks.append((normalize_arabic(chunk) if self.normalize else chunk, start, end))
+            if j + 1 >= len(sentences):
+                break
+            # Step back over trailing sentences that fit in the overlap, always moving forward
+            k = j + 1
+            while k - 1 > i and end - sentences[k - 1][0] <= self.chunk_overlap:
+                k -= 1
+            i = k
+        return chunks
+
+    def _sentence_spans(self, text: str) -> List[Tuple[int, int]]:
+        spans = []
+        start = 0
+        for match in self._SENTENCE_END.finditer(text):
+            end = match.end()
+            spans.extend(self._cut_long_span(text, start, end))
+            start = end
+        if start < len(text):
+            spans.extend(self._cut_long_span(text, start, len(text)))
+        return spans
+
+    def _cut_long_span(self, text: str, start: int, end: int) -> List[Tuple[int, int]]:
+        spans = []
+        while end - start > self.chunk_size:
+            limit = start + self.chunk_size
+            cut = limit
+            # Prefer cutting after the last space or Arabic comma within the limit
+            for match in self._SOFT_BREAK.finditer(text, start + self.chunk_size // 2, limit):
+                cut = match.end()
+            spans.append((start, cut))
+            start = cut
+        spans.append((start, end))
+        return spans
+
 # Define a custom embedding function
 class CustomSentenceTransformerEmbedding(embedding_functions.EmbeddingFunction):
     """
@@ -80,6 +212,8 @@ class CustomSentenceTransformerEmbedding(embedding_functions.EmbeddingFunction):
         Args:
             model_name (str): Name of the SentenceTransformer model to use.
         """
+        from sentence_transformers import SentenceTransformer
+
         self.model = SentenceTransformer(model_name)
 
     def __call__(self, texts: List[str]) -> List[List[float]]:
@@ -100,23 +234,62 @@ class ChromaInterface:
     """
     Interface for interacting with ChromaDB to store and query document embeddings.
     """
-    def __init__(self, collection_name: str, persist_directory: str, text_splitter: TextSplitter):
+    def __init__(self, collection_name: str, persist_directory: str, text_splitter: Optional[TextSplitter] = None,
+                 client=None, embedding_function: Optional[embedding_functions.EmbeddingFunction] = None,
+                 normalize: Optional[bool] = None):
         """
         Initializes the ChromaInterface with a persistent ChromaDB collection and a text splitter.
 
         Args:
             collection_name (str): Name of the collection in ChromaDB.
             persist_directory (str): Directory where the ChromaDB data will be stored.
-            text_splitter (TextSplitter): Text splitter used to divide documents into chunks.
+            text_splitter (Optional[TextSplitter]): Text splitter used to divide documents into chunks.
+                Only required for adding documents.
+            client: Optional existing ChromaDB client to share between interfaces.
+            embedding_function (Optional[EmbeddingFunction]): Optional existing embedding function to share,
+                so the embedding model is only loaded once per process.
+            normalize (Optional[bool]): Whether the collection's chunks are normalised with normalize_arabic,
+                in which case queries are normalised too. Defaults to the text splitter's `normalize` setting,
+                or to the setting recorded in the collection's metadata when no splitter is given.
         """
-        self.client = chromadb.PersistentClient(path=persist_directory)
-        self.embedding_function = CustomSentenceTransformerEmbedding()
+        self.collection_name = collection_name
+        self.client = client or chromadb.PersistentClient(path=persist_directory)
+        self.embedding_function = embedding_function or CustomSentenceTransformerEmbedding()
         self.collection = self.client.get_or_create_collection(
             name=collection_name,
             embedding_function=self.embedding_function
         )
         self.text_splitter = text_splitter
 
+        # The choice is recorded on the collection so that query-only handlers (which have no
+        # splitter) normalise their queries the same way as the indexed chunks.
+        metadata = self.collection.metadata or {}
+        if normalize is None:
+            normalize = getattr(text_splitter, "normalize", None)
+        if normalize is None:
+            normalize = bool(metadata.get("normalize_arabic", False))
+        elif normalize and not metadata.get("normalize_arabic"):
+            self.collection.modify(metadata={**metadata, "normalize_arabic": True})
+        self.normalize = normalize
+
+    def prepare_query(self, query_text: str) -> str:
+        """
+        Returns the query text as it should be embedded, normalised like the collection's chunks.
+        """
+        return normalize_arabic(query_text) if self.normalize else query_text
+
+    def embed_query(self, query_text: str) -> List[float]:
+        """
+        Embeds a query the same way the collection's chunks were embedded.
+
+        Args:
+            query_text (str): The text query.
+
+        Returns:
+            List[float]: The query embedding.
+        """
+        return self.embedding_function([self.prepare_query(query_text)])[0]
+
     def add_documents_from_files(self, file_paths: List[str], metadatas: Optional[List[Dict[str, str]]] = None):
         """
         Adds documents from the specified files into the ChromaDB collection after splitting them into chunks.
@@ -125,33 +298,36 @@ class ChromaInterface:
             file_paths (List[str]): List of file paths containing the documents to add.
             metadatas (Optional[List[Dict[str, str]]]): List of metadata dictionaries corresponding to each file.
         """
+        if self.text_splitter is None:
+            raise ValueError("A text splitter is required to add documents.")
+
         documents = []
         ids = []
+        extended_metadatas = []
         id_counter = 0  # Initialize a counter for unique IDs
 
         # Process each file
-        for file_path in file_paths:
+        for i, file_path in enumerate(file_paths):
             with open(file_path, 'r', encoding='utf-8') as file:
                 content = file.read()
-                # Split the content into chunks
+            # If no metadata is provided, use the file path as the source metadata
+            metadata = metadatas[i] if metadatas and i < len(metadatas) else {"source": file_path}
+
+            # Split the content into chunks, keeping character offsets when the splitter provides them
+            if hasattr(self.text_splitter, "split_text_with_offsets"):
+                for chunk, start, end in self.text_splitter.split_text_with_offsets(content):
+                    documents.append(chunk)
+                    extended_metadatas.append({**metadata, "start": start, "end": end})
+            else:
                 split_texts = self.text_splitter.split_text(content)
                 documents.extend(split_texts)
-                
-                # Generate unique IDs for each chunk
-                for _ in split_texts:
-                    ids.append(f"{os.path.basename(file_path)}_{id_counter}")
-                    id_counter += 1  # Increment the counter for each chunk
+                # Duplicate the metadata for all chunks of the same document
+                extended_metadatas.extend([metadata] * len(split_texts))
 
-        if metadatas is None:
-            # If no metadata is provided, use the file path as the source metadata
-            metadatas = [{"source": file_path} for file_path in file_paths]
-
-        # Adjust metadatas to match the number of document chunks
-        extended_metadatas = []
-        for i, file_path in enumerate(file_paths):
-            metadata = metadatas[i] if metadatas and i < len(metadatas) else {"source": file_path}
-            # Duplicate the metadata for all chunks of the same document
-            extended_metadatas.extend([metadata] * len(self.text_splitter.split_text(open(file_path, 'r', encoding='utf-8').read())))
+            # Generate unique IDs for each chunk
+            while len(ids) < len(documents):
+                ids.append(f"{os.path.basename(file_path)}_{id_counter}")
+                id_counter += 1  # Increment the counter for each chunk
 
         # Add documents and their metadata into the collection
         self.collection.add(
@@ -160,19 +336,200 @@ class ChromaInterface:
             ids=ids
         )
 
-    def query(self, query_text: str, n_results: int = 30) -> List[str]:
+    def add_texts(self, texts: List[str], metadatas: List[Dict[str, object]], ids: List[str]):
+        """
+        Splits already loaded texts into chunks and adds them to the collection in one write.
+
+        Args:
+            texts (List[str]): Texts to add (e.g. chunks streamed from a ChunkStore).
+            metadatas (List[Dict[str, object]]): Metadata for each text, copied to all of its chunks.
+            ids (List[str]): Unique ID prefix for each text; chunks get '<id>_<n>'.
+        """
+        if self.text_splitter is None:
+            raise ValueError("A text splitter is required to add documents.")
+
+        documents = []
+        chunk_metadatas = []
+        chunk_ids = []
+        for text, metadata, text_id in zip(texts, metadatas, ids):
+            if hasattr(self.text_splitter, "split_text_with_offsets"):
+                pieces = self.text_splitter.split_text_with_offsets(text)
+                for n, (chunk, start, end) in enumerate(pieces):
+                    documents.append(chunk)
+                    chunk_metadatas.append({**metadata, "start": start, "end": end})
+                    chunk_ids.append(f"{text_id}_{n}")
+            else:
+                for n, chunk in enumerate(self.text_splitter.split_text(text)):
+                    documents.append(chunk)
+                    chunk_metadatas.append(metadata)
+                    chunk_ids.append(f"{text_id}_{n}")
+
+        if documents:
+            self.collection.add(documents=documents, metadatas=chunk_metadatas, ids=chunk_ids)
+
+    def query(self, query_text: str, n_results: int = 30, trace=NULL_TRACE) -> List[str]:
         """
         Queries the ChromaDB collection for the most relevant documents based on the query text.
         
         Args:
             query_text (str): The text query for searching relevant documents.
             n_results (int): The number of results to return (default is 30).
+            trace: Optional request trace (see tracing.py) that receives the embedding and search timings.
 
         Returns:
             List[str]: List of relevant document chunks.
         """
+        # Embed explicitly (instead of passing query_texts) so embedding and search can be timed separately
+        with trace.stage("query_embedding"):
+            query_embedding = self.embed_query(query_text)
+        with trace.stage("vector_search"):
+            documents, _ = self.query_by_embedding(query_embedding, n_results)
+        return documents
+
+    def query_by_embedding(self, query_embedding: List[float], n_results: int = 30) -> Tuple[List[str], List[float]]:
+        """
+        Queries the collection with an already computed query embedding.
+
+        Args:
+            query_embedding (List[float]): Embedding of the query text.
+            n_results (int): The number of results to return (default is 30).
+
+        Returns:
+            Tuple[List[str], List[float]]: The relevant document chunks and their distances.
+        """
         results = self.collection.query(
-            query_texts=[query_text],
-            n_results=n_results
-        )['documents']
-        return results
+            query_embeddings=[query_embedding],
+            n_results=n_results,
+            include=["documents", "distances"]
+        )
+        return results['documents'][0], results['distances'][0]
+
+
+class CollectionRouter:
+    """
+    Routes queries to the most relevant collections before the full vector search.
+
+    Each collection is represented by the normalised mean of its chunk embeddings (centroid)
+    and, optionally, the embedding of a short subject summary. A query is scored against these
+    vectors, which costs one dot product per collection instead of one vector search.
+    """
+    def __init__(self, interfaces: Dict[str, ChromaInterface], summaries: Optional[Dict[str, str]] = None,
+                 cache_path: Optional[str] = None, batch_size: int = 1000, refresh: bool = False):
+        """
+        Initializes the router and computes (or loads from cache) the collection centroids.
+
+        Args:
+            interfaces (Dict[str, ChromaInterface]): Collection name to interface, sharing one embedding function.
+            summaries (Optional[Dict[str, str]]): Optional short description of each collection's subject.
+            cache_path (Optional[str]): JSON file where centroids are cached between restarts.
+            batch_size (int): Number of embeddings read at a time while computing a centroid.
+            refresh (bool): Recompute every centroid instead of using the cache.
+        """
+        self.interfaces = interfaces
+        self.embedding_function = next(iter(interfaces.values())).embedding_function
+        self.cache_path = cache_path
+        self.batch_size = batch_size
+        self.centroids = {}
+        self.refresh_centroids(force=refresh)
+
+        self.summary_embeddings = {}
+        if summaries:
+            names = [name for name in interfaces if name in summaries]
+            if names:
+                vectors = self.embedding_function([interfaces[name].prepare_query(summaries[name]) for name in names])
+                for name, vector in zip(names, vectors):
+                    self.summary_embeddings[name] = self._normalise(np.asarray(vector, dtype=np.float32))
+
+    def refresh_centroids(self, names: Optional[List[str]] = None, force: bool = True):
+        """
+        Loads or recomputes collection centroids and updates the cache.
+
+        A cached centroid is reused only while the collection's fingerprint (a hash of its chunk ids
+        and texts) is unchanged, so re-indexing a collection with the same number of chunks still
+        invalidates it.
+
+        Args:
+            names (Optional[List[str]]): Collections to refresh (defaults to all of them).
+            force (bool): Recompute even if the cached centroid is still valid.
+        """
+        cache = self._load_cache()
+        for name in names or list(self.interfaces):
+            interface = self.interfaces[name]
+            fingerprint = self._fingerprint(interface)
+            cached = cache.get(name)
+            if not force and cached and cached.get("fingerprint") == fingerprint:
+                self.centroids[name] = np.asarray(cached["centroid"], dtype=np.float32)
+            else:
+                self.centroids[name] = self._compute_centroid(interface)
+                cache[name] = {"fingerprint": fingerprint, "centroid": self.centroids[name].tolist()}
+        self._save_cache(cache)
+
+    def route(self, query_embedding: List[float], max_collections: int = 2, margin: float = 0.05) -> List[Tuple[str, float]]:
+        """
+        Scores every collection against the query and returns the best ones.
+
+        Args:
+            query_embedding (List[float]): Embedding of the query text.
+            max_collections (int): Maximum number of collections to return.
+            margin (float): Collections after the first are only kept if their score is within this margin of the best.
+
+        Returns:
+            List[Tuple[str, float]]: (collection name, score) pairs, best first.
+        """
+        query_vector = self._normalise(np.asarray(query_embedding, dtype=np.float32))
+        scores = []
+        for name, centroid in self.centroids.items():
+            similarities = [float(centroid @ query_vector)]
+            if name in self.summary_embeddings:
+                similarities.append(float(self.summary_embeddings[name] @ query_vector))
+            scores.append((name, sum(similarities) / len(similarities)))
+        scores.sort(key=lambda item: item[1], reverse=True)
+        best_score = scores[0][1]
+        return [item for item in scores[:max_collections] if best_score - item[1] <= margin]
+
+    def _fingerprint(self, interface: ChromaInterface) -> str:
+        # Reading ids and texts is far cheaper than reading the embeddings a centroid needs
+        entries = []
+        offset = 0
+        while True:
+            batch = interface.collection.get(include=["documents"], limit=self.batch_size, offset=offset)
+            if not batch["ids"]:
+                break
+            for chunk_id, document in zip(batch["ids"], batch["documents"]):
+                entries.append(f"{chunk_id}\0{hashlib.sha1((document or '').encode('utf-8')).hexdigest()}")
+            offset += len(batch["ids"])
+        entries.sort()
+        return hashlib.sha1("\n".join(entries).encode('utf-8')).hexdigest()
+
+    def _compute_centroid(self, interface: ChromaInterface) -> np.ndarray:
+        total = None
+        offset = 0
+        while True:
+            batch = interface.collection.get(include=["embeddings"], limit=self.batch_size, offset=offset)
+            embeddings = batch["embeddings"]
+            if embeddings is None or len(embeddings) == 0:
+                break
+            vectors = np.asarray(embeddings, dtype=np.float32)
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+            batch_sum = vectors.sum(axis=0)
+            total = batch_sum if total is None else total + batch_sum
+            offset += len(vectors)
+        if total is None:
+            raise ValueError(f"Collection '{interface.collection_name}' is empty and cannot be routed to.")
+        return self._normalise(total)
+
+    def _load_cache(self) -> dict:
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return {}
+        with open(self.cache_path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+
+    def _save_cache(self, cache: dict):
+        if not self.cache_path:
+            return
+        with open(self.cache_path, 'w', encoding='utf-8') as file:
+            json.dump(cache, file)
+
+    @staticmethod
+    def _normalise(vector: np.ndarray) -> np.ndarray:
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
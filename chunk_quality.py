@@ -0,0 +1,235 @@
+import argparse
+import difflib
+import os
+import re
+import textwrap
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Arabic letters (without tashkeel/tatweel), digits and punctuation that appear in clean textbook text
+_ARABIC_LETTERS = re.compile(r"[ء-غف-يٱ-ۓ]")
+_EXPECTED_CHARS = re.compile(r"[ء-غـ-ْ٠-٩ٰ-ۓ\s0-9.,:;!?()\[\]\-\"'«»،؛؟*/%+=]")
+_NON_SPACE = re.compile(r"\S")
+_FAILED_CORRECTION = "[تنبيه: لم يتم معالجة"
+
+
+class CharNgramModel:
+    """
+    Character trigram language model backed by hashed count tables, so training and scoring
+    are a handful of numpy operations per text instead of a Python loop per character.
+    """
+
+    def __init__(self, table_bits: int = 20, smoothing: float = 0.1, vocabulary_size: int = 200):
+        """
+        Args:
+            table_bits (int): log2 of the hash table size used for trigram and bigram counts.
+            smoothing (float): Add-k smoothing constant.
+            vocabulary_size (int): Approximate number of distinct characters, used by the smoothing.
+        """
+        self.table_size = 1 << table_bits
+        self.smoothing = smoothing
+        self.vocabulary_size = vocabulary_size
+        self.trigram_counts = np.zeros(self.table_size, dtype=np.float64)
+        self.bigram_counts = np.zeros(self.table_size, dtype=np.float64)
+
+    def _hashes(self, text: str):
+        codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).astype(np.int64)
+        if len(codes) < 3:
+            return None, None
+        bigrams = (codes[:-2] * 1000003 + codes[1:-1]) % self.table_size
+        trigrams = (codes[:-2] * 1000003 + codes[1:-1] * 8191 + codes[2:]) % self.table_size
+        return bigrams, trigrams
+
+    def train(self, texts: List[str]):
+        """
+        Adds the character trigrams of the given (clean) texts to the model.
+        """
+        for text in texts:
+            bigrams, trigrams = self._hashes(text)
+            if trigrams is None:
+                continue
+            self.bigram_counts += np.bincount(bigrams, minlength=self.table_size)
+            self.trigram_counts += np.bincount(trigrams, minlength=self.table_size)
+
+    def score(self, text: str) -> float:
+        """
+        Returns the average log-probability per character; lower means less like the training text.
+        """
+        bigrams, trigrams = self._hashes(text)
+        if trigrams is None:
+            return 0.0
+        numerator = self.trigram_counts[trigrams] + self.smoothing
+        denominator = self.bigram_counts[bigrams] + self.smoothing * self.vocabulary_size
+        return float(np.mean(np.log(numerator / denominator)))
+
+
+class ChunkQualityScorer:
+    """
+    Scores OCR and corrected chunks and ranks the ones most likely to need re-OCR or re-correction.
+
+    Per-chunk features are the Arabic letter ratio, the density of unexpected characters (OCR noise),
+    the character trigram language-model score and, when both versions are given, the edit ratio
+    between the OCR text and the corrected text. Features are standardised over the batch and
+    combined into one suspicion score, so the ranking adapts to each book.
+    """
+
+    DEFAULT_WEIGHTS = {"arabic_ratio": 1.0, "noise_density": 1.0, "lm_score": 1.5, "edit_ratio": 1.0}
+
+    def __init__(self, language_model: CharNgramModel, weights: Optional[Dict[str, float]] = None):
+        """
+        Args:
+            language_model (CharNgramModel): Model trained on clean reference text.
+            weights (Optional[Dict[str, float]]): Weight of each standardised feature in the suspicion score.
+        """
+        self.language_model = language_model
+        self.weights = weights or self.DEFAULT_WEIGHTS
+
+    def features(self, text: str, ocr_text: Optional[str] = None) -> Dict[str, float]:
+        non_space = max(len(_NON_SPACE.findall(text)), 1)
+        arabic = len(_ARABIC_LETTERS.findall(text))
+        expected = len(_EXPECTED_CHARS.findall(text))
+        result = {
+            "arabic_ratio": arabic / non_space,
+            "noise_density": (len(text) - expected) / max(len(text), 1),
+            "lm_score": self.language_model.score(text),
+        }
+        if ocr_text is not None:
+            matcher = difflib.SequenceMatcher(None, ocr_text, text, autojunk=False)
+            result["edit_ratio"] = 1.0 - matcher.ratio()
+        return result
+
+    def rank(self, chunks: List[str], ocr_chunks: Optional[List[str]] = None) -> List[Dict[str, object]]:
+        """
+        Scores every chunk and returns them sorted from most to least suspect.
+
+        Args:
+            chunks (List[str]): The chunks to score (OCR output, or corrected text).
+            ocr_chunks (Optional[List[str]]): The OCR chunks the corrected `chunks` came from, same order.
+
+        Returns:
+            List[Dict[str, object]]: One entry per chunk with its number, features and 'suspicion' score.
+        """
+        reports = []
+        for number, text in enumerate(chunks):
+            ocr_text = ocr_chunks[number] if ocr_chunks is not None and number < len(ocr_chunks) else None
+            report = {"chunk": number, **self.features(text, ocr_text)}
+            report["failed_correction"] = _FAILED_CORRECTION in text
+            reports.append(report)
+        if not reports:
+            return reports
+
+        # Standardise each feature over the batch, oriented so that larger means more suspect
+        suspicion = np.zeros(len(reports))
+        orientation = {"arabic_ratio": -1.0, "noise_density": 1.0, "lm_score": -1.0, "edit_ratio": 1.0}
+        for name, sign in orientation.items():
+            present = [report[name] for report in reports if name in report]
+            if not present:
+                continue
+            # Chunks without an OCR counterpart (e.g. past the end of the OCR text) get the batch mean,
+            # which is neutral after standardisation
+            mean = float(np.mean(present))
+            for report in reports:
+                report.setdefault(name, mean)
+            values = np.array([report[name] for report in reports], dtype=np.float64)
+            spread = values.std()
+            z_scores = (values - values.mean()) / spread if spread > 0 else np.zeros_like(values)
+            suspicion += self.weights.get(name, 0.0) * sign * z_scores
+
+        for report, score in zip(reports, suspicion):
+            # Chunks the corrector gave up on always go to the top
+            report["suspicion"] = float(score) + (100.0 if report["failed_correction"] else 0.0)
+        return sorted(reports, key=lambda report: report["suspicion"], reverse=True)
+
+    @staticmethod
+    def suspects(ranked: List[Dict[str, object]], threshold: float = 2.0) -> List[int]:
+        """
+        Returns the chunk numbers whose suspicion score is above `threshold`, most suspect first.
+        """
+        return [report["chunk"] for report in ranked if report["suspicion"] > threshold]
+
+
+def load_corrected_chunks(source: str) -> List[str]:
+    """
+    Loads corrected chunks from a folder of corrected_chunk_N.txt files or from a ChunkStore (.pack).
+    """
+    if source.endswith(".pack"):
+        from chunk_store import ChunkStore
+        store = ChunkStore(source)
+        return [store.read(number) for number in range(len(store))]
+
+    chunks = {}
+    for name in os.listdir(source):
+        match = re.fullmatch(r'corrected_chunk_(\d+)\.txt', name)
+        if match:
+            with open(os.path.join(source, name), 'r', encoding='utf-8') as file:
+                chunks[int(match.group(1))] = file.read()
+    return [chunks.get(number, "") for number in range(max(chunks) + 1)] if chunks else []
+
+
+def load_ocr_chunks(ocr_file: str, chunk_size: int = 1000) -> List[str]:
+    """
+    Splits an OCR output file the same way ArabicTextCorrector does, so chunk numbers line up.
+    """
+    with open(ocr_file, 'r', encoding='utf-8') as file:
+        return textwrap.wrap(file.read(), chunk_size)
+
+
+def book_name(path: str) -> str:
+    """
+    Returns the subject a book file or chunk folder belongs to, e.g. 'bio' for taw_bio.txt,
+    correct_bio, correct_bio.pack or corrected_bio.txt.
+    """
+    name = os.path.splitext(os.path.basename(path.rstrip(os.sep)))[0]
+    return re.sub(r"^(?:taw|corrected|correct)_", "", name)
+
+
+def default_references(excluded_books: List[str], folder: str = ".") -> List[str]:
+    """
+    Returns the merged corrected books (corrected_*.txt) in `folder`, leaving out the books being scored
+    so the language model never rates a chunk against its own text.
+    """
+    return sorted(
+        os.path.join(folder, name) for name in os.listdir(folder)
+        if re.fullmatch(r"corrected_.+\.txt", name) and book_name(name) not in excluded_books
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rank OCR / corrected chunks by how likely they are to be bad.")
+    parser.add_argument("--ocr", help="OCR output file produced by PDFTextExtractor (e.g. taw_bio.txt).")
+    parser.add_argument("--corrected", help="Folder of corrected_chunk_N.txt files or a .pack chunk store.")
+    parser.add_argument("--reference", nargs="+",
+                        help="Clean text used to train the character language model "
+                             "(defaults to the other books' corrected_*.txt, leaving out the book being scored).")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--threshold", type=float, default=2.0)
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+    if not args.ocr and not args.corrected:
+        parser.error("at least one of --ocr and --corrected is required")
+    references = args.reference
+    if not references:
+        references = default_references([book_name(path) for path in (args.ocr, args.corrected) if path])
+        if not references:
+            parser.error("no reference text found for the other books; pass --reference")
+
+    model = CharNgramModel()
+    for path in references:
+        with open(path, 'r', encoding='utf-8') as file:
+            model.train([file.read()])
+    scorer = ChunkQualityScorer(model)
+
+    ocr_chunks = load_ocr_chunks(args.ocr, args.chunk_size) if args.ocr else None
+    if args.corrected:
+        ranked = scorer.rank(load_corrected_chunks(args.corrected), ocr_chunks)
+    else:
+        ranked = scorer.rank(ocr_chunks)
+    if not ranked:
+        print("No chunks to score.")
+    else:
+        columns = [name for name in ("arabic_ratio", "noise_density", "lm_score", "edit_ratio") if name in ranked[0]]
+        print(f"{'chunk':>6}{'suspicion':>11}" + "".join(f"{name:>15}" for name in columns))
+        for report in ranked[:args.top]:
+            print(f"{report['chunk']:>6}{report['suspicion']:>11.2f}" + "".join(f"{report[name]:>15.3f}" for name in columns))
+        print(f"suspect_chunks = {scorer.suspects(ranked, args.threshold)}")
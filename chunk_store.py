@@ -0,0 +1,258 @@
+import mmap
+import os
+import re
+import struct
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class ChunkStore:
+    """
+    Packed store for the numbered chunks produced by the OCR correction workflow.
+
+    All chunk texts live in one data file (UTF-8, no framing) and a small sidecar index
+    (`<path>.idx`) records the offset, length and reserved capacity of every chunk number.
+    Reads go through a memory map, so random access is a slice and exporting the whole book
+    is one sequential pass instead of hundreds of small file opens.
+
+    Replacing a chunk overwrites it in place when the new text fits in the reserved capacity
+    (each record gets some slack for manual edits); otherwise it is appended to the end of the
+    data file and the old space is reclaimed by `compact()`.
+    """
+
+    MAGIC = b"CHNKPK01"
+    INDEX_MAGIC = b"CHNKIX01"
+    _ENTRY = struct.Struct("<QII")  # offset, length, capacity
+
+    def __init__(self, path: str, slack: float = 0.25):
+        """
+        Opens the store at `path`, creating an empty one if it does not exist.
+
+        Args:
+            path (str): Path of the data file; the index is stored at `path + '.idx'`.
+            slack (float): Extra capacity reserved per record, as a fraction of its size.
+        """
+        self.path = path
+        self.index_path = path + ".idx"
+        self.slack = slack
+        self._mmap = None
+        self._mapped_size = 0
+
+        if not os.path.exists(path):
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(path, 'wb') as data:
+                data.write(self.MAGIC)
+            self.entries: List[Tuple[int, int, int]] = []
+            self._save_index()
+        else:
+            with open(path, 'rb') as data:
+                if data.read(len(self.MAGIC)) != self.MAGIC:
+                    raise ValueError(f"{path} is not a chunk store.")
+            self.entries = self._load_index()
+
+    @classmethod
+    def from_folder(cls, input_folder: str, path: str, pattern: str = r'corrected_chunk_(\d+)\.txt') -> "ChunkStore":
+        """
+        Builds a store from a folder of numbered chunk files (e.g. correct_bio/corrected_chunk_N.txt).
+
+        Args:
+            input_folder (str): Folder containing the chunk files.
+            path (str): Path of the store to create.
+            pattern (str): Regex whose first group is the chunk number.
+
+        Returns:
+            ChunkStore: The populated store.
+
+        Raises:
+            FileExistsError: If a store already exists at `path`; it may hold chunks written
+                directly to the store that the folder does not have.
+        """
+        if os.path.exists(path) or os.path.exists(path + ".idx"):
+            raise FileExistsError(f"A chunk store already exists at {path}.")
+        numbered = []
+        for name in os.listdir(input_folder):
+            match = re.fullmatch(pattern, name)
+            if match:
+                numbered.append((int(match.group(1)), name))
+        numbered.sort()
+
+        store = cls(path)
+        texts = {}
+        for number, name in numbered:
+            with open(os.path.join(input_folder, name), 'r', encoding='utf-8') as file:
+                texts[number] = file.read()
+        store.write_many(texts)
+        return store
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, number: int) -> bool:
+        return 0 <= number < len(self.entries) and self.entries[number][0] != 0
+
+    def read(self, number: int) -> str:
+        """
+        Returns the text of a chunk (an empty string for numbers that were never written).
+
+        Args:
+            number (int): Chunk number.
+        """
+        if number < 0 or number >= len(self.entries):
+            raise IndexError(f"Chunk number {number} is out of range.")
+        offset, length, _ = self.entries[number]
+        if length == 0:
+            return ""
+        return self._map()[offset:offset + length].decode('utf-8')
+
+    def write(self, number: int, text: str):
+        """
+        Writes or replaces a single chunk.
+
+        Args:
+            number (int): Chunk number; writing past the end leaves empty chunks in any gap.
+            text (str): The chunk text.
+        """
+        self.write_many({number: text})
+
+    def write_many(self, texts: Dict[int, str]):
+        """
+        Writes or replaces several chunks with a single index update.
+
+        Args:
+            texts (Dict[int, str]): Chunk number to chunk text.
+        """
+        if not texts:
+            return
+        highest = max(texts)
+        while len(self.entries) <= highest:
+            self.entries.append((0, 0, 0))
+
+        with open(self.path, 'r+b') as data:
+            data.seek(0, os.SEEK_END)
+            end = data.tell()
+            for number in sorted(texts):
+                payload = texts[number].encode('utf-8')
+                offset, _, capacity = self.entries[number]
+                if offset and len(payload) <= capacity:
+                    # Fits in the reserved space: overwrite in place
+                    data.seek(offset)
+                    data.write(payload)
+                    self.entries[number] = (offset, len(payload), capacity)
+                else:
+                    capacity = int(len(payload) * (1 + self.slack))
+                    data.seek(end)
+                    data.write(payload + b"\0" * (capacity - len(payload)))
+                    self.entries[number] = (end, len(payload), capacity)
+                    end += capacity
+        self._invalidate_map()
+        self._save_index()
+
+    def iter_chunks(self) -> Iterator[Tuple[int, str]]:
+        """
+        Streams (chunk number, text) pairs in chunk order, skipping chunks that were never written.
+        """
+        mapped = self._map() if self.entries else None
+        for number, (offset, length, _) in enumerate(self.entries):
+            if offset:
+                yield number, mapped[offset:offset + length].decode('utf-8')
+
+    def export_text(self, output_file: str, separator: str = "\n\n"):
+        """
+        Writes all chunks, in order, to a single text file (the format produced by merge_chunks).
+
+        Args:
+            output_file (str): The merged output file.
+            separator (str): Text written after every chunk.
+        """
+        with open(output_file, 'w', encoding='utf-8') as output:
+            for _, text in self.iter_chunks():
+                output.write(text)
+                output.write(separator)
+
+    def export_to_chroma(self, chroma_interface, source: Optional[str] = None, batch_size: int = 50):
+        """
+        Streams the chunks into a ChromaInterface, recording the chunk number in the metadata.
+
+        Args:
+            chroma_interface (ChromaInterface): Interface whose text splitter and collection receive the chunks.
+            source (Optional[str]): Value for the 'source' metadata (defaults to the store file name).
+            batch_size (int): Number of store chunks added per collection write.
+        """
+        source = source or os.path.basename(self.path)
+        batch = []
+        for number, text in self.iter_chunks():
+            batch.append((number, text))
+            if len(batch) >= batch_size:
+                self._add_batch(chroma_interface, source, batch)
+                batch = []
+        if batch:
+            self._add_batch(chroma_interface, source, batch)
+
+    def compact(self):
+        """
+        Rewrites the data file sequentially in chunk order, dropping space left by relocated chunks.
+        """
+        texts = {number: text for number, text in self.iter_chunks()}
+        count = len(self.entries)
+        self._invalidate_map()
+        with open(self.path, 'wb') as data:
+            data.write(self.MAGIC)
+        self.entries = []
+        self.write_many(texts)
+        while len(self.entries) < count:
+            self.entries.append((0, 0, 0))
+        self._save_index()
+
+    def close(self):
+        self._invalidate_map()
+
+    def _add_batch(self, chroma_interface, source: str, batch: List[Tuple[int, str]]):
+        texts = [text for _, text in batch]
+        metadatas = [{"source": source, "chunk": number} for number, _ in batch]
+        ids = [f"{source}_{number}" for number, _ in batch]
+        chroma_interface.add_texts(texts, metadatas=metadatas, ids=ids)
+
+    def _map(self):
+        size = os.path.getsize(self.path)
+        if self._mmap is None or self._mapped_size != size:
+            self._invalidate_map()
+            with open(self.path, 'rb') as data:
+                self._mmap = mmap.mmap(data.fileno(), 0, access=mmap.ACCESS_READ)
+            self._mapped_size = size
+        return self._mmap
+
+    def _invalidate_map(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+            self._mapped_size = 0
+
+    def _load_index(self) -> List[Tuple[int, int, int]]:
+        with open(self.index_path, 'rb') as index:
+            if index.read(len(self.INDEX_MAGIC)) != self.INDEX_MAGIC:
+                raise ValueError(f"{self.index_path} is not a chunk store index.")
+            (count,) = struct.unpack("<I", index.read(4))
+            raw = index.read(count * self._ENTRY.size)
+        return [self._ENTRY.unpack_from(raw, i * self._ENTRY.size) for i in range(count)]
+
+    def _save_index(self):
+        # Write to a temporary file first so a crash never leaves a truncated index
+        temp_path = self.index_path + ".tmp"
+        with open(temp_path, 'wb') as index:
+            index.write(self.INDEX_MAGIC)
+            index.write(struct.pack("<I", len(self.entries)))
+            for entry in self.entries:
+                index.write(self._ENTRY.pack(*entry))
+        os.replace(temp_path, self.index_path)
+
+
+if __name__ == "__main__":
+    # Pack an existing folder of corrected chunks once, then rebuild the merged text from the store
+    if os.path.exists("correct_bio.pack"):
+        store = ChunkStore("correct_bio.pack")
+    else:
+        store = ChunkStore.from_folder("correct_bio", "correct_bio.pack")
+        print(f"Packed {len(store)} chunks into {store.path}")
+    store.export_text("corrected_bio.txt")
+    store.close()
@@ -0,0 +1,137 @@
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import List, Optional, Tuple
+
+# Follow-ups such as "explain more" start with one of these words and carry no topic of their own
+_FOLLOW_UP = re.compile(
+    r"^\s*[وف]?(?:اشرح|وضح|وضّح|فصل|فصّل|زدني|المزيد|لماذا|كيف ذلك|ماذا عن|ماذا|"
+    r"explain|elaborate|more|why|how so|what about)(?!\w)",
+    re.IGNORECASE
+)
+_WORD = re.compile(r"\w+")
+# Words that do not name a topic; a query made only of these refers back to the previous question
+_NON_CONTENT_WORDS = frozenset("""
+    اشرح وضح فصل زدني المزيد مزيد أكثر اكثر لماذا كيف ماذا متى أين اين هل ما من عن في على إلى الى
+    هذا هذه ذلك تلك هو هي هم ذاك بعد كذلك أيضا ايضا بالتفصيل تفصيل التفصيل اكمل أكمل تابع لي لنا نعم لا شكرا
+    explain elaborate more why how what about so this that it its these those please again tell me
+    detail details further continue yes no and the a an of on in
+""".split())
+
+
+class _ChatHistory:
+    __slots__ = ("turns", "last_seen")
+
+    def __init__(self, max_turns: int):
+        self.turns = deque(maxlen=max_turns)
+        self.last_seen = time.monotonic()
+
+
+class ConversationMemory:
+    """
+    Bounded per-chat memory of recent (question, answer) turns.
+
+    Each chat keeps a fixed-size ring buffer of turns with questions and answers truncated to
+    `max_text_chars`; at most `max_chats` chats are kept (least recently used are evicted)
+    and chats idle for longer than `idle_timeout` seconds are dropped, so memory stays bounded
+    no matter how many students talk to the bot.
+    """
+
+    def __init__(self, max_turns: int = 3, max_chats: int = 5000, idle_timeout: float = 1800.0,
+                 max_text_chars: int = 300, follow_up_max_words: int = 4):
+        """
+        :param max_turns: Number of recent turns kept per chat.
+        :param max_chats: Maximum number of chats held in memory.
+        :param idle_timeout: Seconds of inactivity after which a chat's history is forgotten.
+        :param max_text_chars: Questions and answers are truncated to this many characters before being stored.
+        :param follow_up_max_words: Queries without a follow-up word (e.g. "and the cause?") are only
+            treated as follow-ups if they are at most this many words long.
+        """
+        self.max_turns = max_turns
+        self.max_chats = max_chats
+        self.idle_timeout = idle_timeout
+        self.max_text_chars = max_text_chars
+        self.follow_up_max_words = follow_up_max_words
+        self._chats: "OrderedDict[object, _ChatHistory]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._chats)
+
+    def get_turns(self, chat_id) -> List[Tuple[str, str]]:
+        """
+        :return: The chat's recent (question, answer) turns, oldest first.
+        """
+        with self._lock:
+            history = self._get(chat_id)
+            return list(history.turns) if history else []
+
+    def add_turn(self, chat_id, question: str, answer: str):
+        """
+        Records a turn. Store the condensed (standalone) question so chained follow-ups keep the topic.
+        """
+        with self._lock:
+            history = self._get(chat_id)
+            if history is None:
+                history = _ChatHistory(self.max_turns)
+                self._chats[chat_id] = history
+                self._evict()
+            history.turns.append((question[:self.max_text_chars], answer[:self.max_text_chars]))
+            history.last_seen = time.monotonic()
+
+    def clear(self, chat_id):
+        with self._lock:
+            self._chats.pop(chat_id, None)
+
+    def is_follow_up(self, query: str) -> bool:
+        """
+        A query is a follow-up when it names no topic of its own: apart from follow-up and function words
+        it has no content words, and it either starts with a follow-up word or is very short.
+        """
+        if _content_words(query):
+            return False
+        return bool(_FOLLOW_UP.match(query)) or len(query.split()) <= self.follow_up_max_words
+
+    def condense_query(self, chat_id, query: str) -> str:
+        """
+        Builds a standalone retrieval query: follow-up questions are prefixed with the previous question,
+        so "explain more" retrieves context about the topic being discussed.
+
+        :param chat_id: The chat the query came from.
+        :param query: The user's message.
+        :return: The query to use for retrieval.
+        """
+        turns = self.get_turns(chat_id)
+        if not turns or not self.is_follow_up(query):
+            return query
+        return f"{turns[-1][0]} {query}"
+
+    def _get(self, chat_id) -> Optional[_ChatHistory]:
+        history = self._chats.get(chat_id)
+        if history is None:
+            return None
+        if time.monotonic() - history.last_seen > self.idle_timeout:
+            del self._chats[chat_id]
+            return None
+        self._chats.move_to_end(chat_id)
+        return history
+
+    def _evict(self):
+        now = time.monotonic()
+        # Drop idle chats from the least recently used end, then enforce the size cap
+        while self._chats:
+            oldest_id, oldest = next(iter(self._chats.items()))
+            if now - oldest.last_seen <= self.idle_timeout and len(self._chats) <= self.max_chats:
+                break
+            del self._chats[oldest_id]
+
+
+def _content_words(text: str) -> List[str]:
+    content = []
+    for word in _WORD.findall(text.lower()):
+        # Arabic attaches the conjunctions و / ف to the next word ("ولماذا")
+        stripped = word[1:] if word[0] in "وف" and len(word) > 3 else word
+        if len(word) > 2 and word not in _NON_CONTENT_WORDS and stripped not in _NON_CONTENT_WORDS:
+            content.append(word)
+    return content
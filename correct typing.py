@@ -2,7 +2,8 @@ import os
 import textwrap
 import time
 from llm import GeminiLLM
-from typing import List
+from chunk_store import ChunkStore
+from typing import List, Optional, Union
 from dotenv import load_dotenv
 
 
@@ -48,8 +49,10 @@ class ArabicTextCorrector:
             # Return a note indicating the chunk was not processed
             return f"\n\n[تنبيه: لم يتم معالجة هذا الجزء بسبب خطأ]\n\n{text}"
 
-    def process_file(self, input_file: str, output_file: str, output_folder: str, chunk_size: int = 1000, custom_prompt: str = None):
-        """Processes the input file in chunks, corrects, and saves the output."""
+    def process_file(self, input_file: str, output_file: str, output_folder: str, chunk_size: int = 1000, custom_prompt: str = None,
+                     chunk_store: Optional[ChunkStore] = None):
+        """Processes the input file in chunks, corrects, and saves the output.
+        Chunks go to `chunk_store` when given, otherwise to one file per chunk in `output_folder`."""
         start_time = time.time()
 
         # Ensure the output folder exists
@@ -64,8 +67,11 @@ class ArabicTextCorrector:
             corrected_chunk = self.correct_text(chunk, custom_prompt)
             corrected_text += corrected_chunk
             # Save each processed chunk
-            output_path = os.path.join(output_folder, f'corrected_chunk_{i}.txt')
-            self.save_text_to_file(corrected_chunk, output_path)
+            if chunk_store is not None:
+                chunk_store.write(i, corrected_chunk)
+            else:
+                output_path = os.path.join(output_folder, f'corrected_chunk_{i}.txt')
+                self.save_text_to_file(corrected_chunk, output_path)
             print(f"Processed chunk {i + 1} of {len(chunks)}")
 
         # Save the final corrected text to the output file
@@ -78,8 +84,11 @@ class ArabicTextCorrector:
         log_message = f"{os.path.basename(__file__)} --> time taken: {runtime:.2f} seconds --> start of the run: {time.ctime(start_time)}\n"
         self.log_runtime(log_message)
 
-    def save_chunks_without_processing(self, input_file: str, chunk_numbers: List[int], output_folder: str, chunk_size: int = 1000):
-        """Saves specified chunks without processing them."""
+    def save_chunks_without_processing(self, input_file: str, chunk_numbers: List[int], output_folder: str, chunk_size: int = 1000,
+                                       chunk_store: Optional[ChunkStore] = None):
+        """Saves specified chunks without processing them, replacing them in `chunk_store` when given.
+        Chunk numbers count from 0, like the chunks written by process_file and the numbers reported by
+        chunk_quality.py, so chunk N of the input replaces corrected chunk N."""
         # Ensure the output folder exists
         os.makedirs(output_folder, exist_ok=True)
 
@@ -88,13 +97,33 @@ class ArabicTextCorrector:
         chunks = self.split_text(text, chunk_size)
 
         for index in chunk_numbers:
-            if index < 1 or index > len(chunks):
+            if index < 0 or index >= len(chunks):
                 print(f"Chunk number {index} is out of range.")
                 continue
-            chunk = chunks[index - 1]  # Convert 1-based index to 0-based
-            output_path = os.path.join(output_folder, f'corrected_chunk_{index}.txt')
-            self.save_text_to_file(chunk, output_path)
-            print(f"Saved chunk {index} of {len(chunks)}")
+            chunk = chunks[index]
+            if chunk_store is not None:
+                chunk_store.write(index, chunk)
+            else:
+                output_path = os.path.join(output_folder, f'corrected_chunk_{index}.txt')
+                self.save_text_to_file(chunk, output_path)
+            print(f"Saved chunk {index} ({len(chunks)} chunks in total)")
+
+    def pack_chunks(self, input_folder: str, store_path: str) -> ChunkStore:
+        """Converts a folder of corrected_chunk_N.txt files into a chunk store (refuses to overwrite an existing one)."""
+        return ChunkStore.from_folder(input_folder, store_path)
+
+    def merge_chunks(self, chunk_store: Union[ChunkStore, str], output_file: str):
+        """Merges the chunks of a chunk store (or the path of a .pack file) into one file, in chunk order."""
+        if isinstance(chunk_store, str):
+            if not os.path.exists(chunk_store):
+                raise FileNotFoundError(f"No chunk store at {chunk_store}.")
+            chunk_store = ChunkStore(chunk_store)
+            try:
+                chunk_store.export_text(output_file)
+            finally:
+                chunk_store.close()
+        else:
+            chunk_store.export_text(output_file)
 
     def log_runtime(self, log_message: str):
         """Logs runtime information into runtime.log."""
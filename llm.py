@@ -1,10 +1,18 @@
 from abc import ABC, abstractmethod
-import google.generativeai as genai
-import boto3
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Optional, Tuple
 import json
-import requests
-from dotenv import load_dotenv
 import os
+import threading
+import time
+
+
+class LLMRequestError(RuntimeError):
+    """
+    Raised when an LLM backend fails to produce content (network error, bad status or unparsable response).
+    """
+    pass
 
 class LLM(ABC):
     """
@@ -44,6 +52,8 @@ class TitanLLM(LLM):
         :param api_key: (Not used for Titan, included for compatibility).
         :param kwargs: Additional configuration parameters, e.g., model_id and region_name.
         """
+        import boto3  # Imported lazily so unused providers don't slow down startup
+
         self.bedrock = boto3.client(
             service_name='bedrock-runtime',
             region_name=kwargs.get('region_name', self.region_name)
@@ -95,6 +105,8 @@ class GeminiLLM(LLM):
         
         :param api_key: API key for accessing the Google Generative AI service.
         """
+        import google.generativeai as genai  # Imported lazily so unused providers don't slow down startup
+
         genai.configure(api_key=api_key)
         self.model = genai.GenerativeModel(self.model_name)
     
@@ -124,6 +136,8 @@ class ClaudeLLM(LLM):
         :param api_key: (Not used for Claude, included for compatibility).
         :param kwargs: Additional configuration parameters, e.g., model_id and region_name.
         """
+        import boto3  # Imported lazily so unused providers don't slow down startup
+
         self.bedrock = boto3.client(
             service_name='bedrock-runtime',
             region_name=kwargs.get('region_name', self.region_name)
@@ -164,13 +178,15 @@ class CustomLLM(LLM):
     This class sends a POST request to a specified API endpoint using the provided prompt and API token.
     """
 
-    def __init__(self, url: str):
+    def __init__(self, url: str, timeout: float = 60.0):
         """
         Initializes the CustomLLM with the API URL.
 
         :param url: The endpoint URL of the API to which requests will be sent.
+        :param timeout: Seconds to wait for the API to respond before the request fails.
         """
         self.url = url
+        self.timeout = timeout
         self.auth_token = None
 
     def configure(self, api_key: str = None, **kwargs):
@@ -178,10 +194,11 @@ class CustomLLM(LLM):
         Configure the Custom LLM with necessary parameters such as the API token.
 
         :param api_key: The API token used for authentication (optional).
-        :param kwargs: Additional configuration parameters (for example, `auth_token`).
+        :param kwargs: Additional configuration parameters (for example, `auth_token` or `timeout`).
         """
         # Use the provided API key or get it from kwargs
         self.auth_token = kwargs.get("auth_token", api_key)
+        self.timeout = kwargs.get("timeout", self.timeout)
 
         if not self.auth_token:
             raise ValueError("Authentication token must be provided.")
@@ -193,8 +210,11 @@ class CustomLLM(LLM):
         This method sends the prompt as part of the POST request's payload to the API and processes the response.
 
         :param prompt: The text prompt that will be sent to the API to generate content.
-        :return: The generated content as a string, or an error message if something goes wrong.
+        :return: The generated content as a string.
+        :raises LLMRequestError: If the request fails or the response cannot be parsed.
         """
+        import requests  # Imported lazily so unused providers don't slow down startup
+
         # Ensure the LLM is configured with an authentication token
         if not self.auth_token:
             raise ValueError("Authentication token is not set. Please configure the LLM before generating content.")
@@ -212,10 +232,10 @@ class CustomLLM(LLM):
 
         # Make the POST request and handle potential errors
         try:
-            response = requests.post(self.url, headers=headers, json=payload)
+            response = requests.post(self.url, headers=headers, json=payload, timeout=self.timeout)
             response.raise_for_status()  # Raise an error for bad HTTP statuses
         except requests.exceptions.RequestException as e:
-            return f"Error during the API request: {e}"
+            raise LLMRequestError(f"Error during the API request: {e}") from e
 
         # Parse the response data
         try:
@@ -223,10 +243,13 @@ class CustomLLM(LLM):
             response_body = json.loads(response_json['body'])  # Decode the 'body' part of the response
 
             # Extract relevant fields from the response
-            content = response_body.get('content', 'No content returned')
+            content = response_body.get('content')
             message = response_body.get('message', 'No message returned')
-        except (KeyError, json.JSONDecodeError) as e:
-            return f"Error parsing the API response: {str(e)}"
+        except (KeyError, TypeError, AttributeError, json.JSONDecodeError) as e:
+            raise LLMRequestError(f"Error parsing the API response: {str(e)}") from e
+
+        if not content:
+            raise LLMRequestError(f"The API response contained no content (message: {message})")
 
         # Prepare the formatted result text
         result_text = f"Status Code: {response.status_code}\n"
@@ -252,8 +275,238 @@ class CustomLLM(LLM):
             print(f"Error writing the response to file: {e}")
 
 
+class ProviderStats:
+    """
+    Rolling latency/error statistics and circuit breaker state for a single provider.
+
+    The circuit opens after `failure_threshold` consecutive failures and stays open for
+    `reset_timeout` seconds. After that a single trial request is let through (half-open);
+    a success closes the circuit again, a failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, window_size: int = 100, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        """
+        :param window_size: Number of recent calls kept for latency percentiles and error rate.
+        :param failure_threshold: Consecutive failures needed to open the circuit.
+        :param reset_timeout: Seconds the circuit stays open before a trial request is allowed.
+        """
+        self.latencies = deque(maxlen=window_size)
+        self.outcomes = deque(maxlen=window_size)
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.consecutive_failures = 0
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def record_success(self, latency: float):
+        with self._lock:
+            self.latencies.append(latency)
+            self.outcomes.append(True)
+            self.consecutive_failures = 0
+            self.state = self.CLOSED
+
+    def record_failure(self, latency: float):
+        with self._lock:
+            self.outcomes.append(False)
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def is_available(self) -> bool:
+        """
+        Returns True if the circuit would let a request through, without changing its state.
+        """
+        with self._lock:
+            return self._allows()
+
+    def acquire(self) -> bool:
+        """
+        Called right before a request is sent: returns True if the circuit lets it through,
+        moving an expired open circuit to half-open so that this request is its single trial.
+        """
+        with self._lock:
+            if not self._allows():
+                return False
+            if self.state == self.OPEN:
+                self.state = self.HALF_OPEN
+            return True
+
+    def _allows(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        return self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout
+
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self.outcomes:
+                return 0.0
+            return self.outcomes.count(False) / len(self.outcomes)
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        """
+        :param percentile: Percentile in the range 0-100.
+        :return: The latency at that percentile in seconds, or None if no successful calls were recorded.
+        """
+        with self._lock:
+            if not self.latencies:
+                return None
+            ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(round(percentile / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def sample_count(self) -> int:
+        with self._lock:
+            return len(self.latencies)
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state,
+            "error_rate": self.error_rate(),
+            "p50": self.latency_percentile(50),
+            "p95": self.latency_percentile(95),
+            "samples": self.sample_count(),
+        }
+
+
+class RouterLLM(LLM):
+    """
+    Composite LLM that routes prompts across several configured providers.
+
+    Providers are tried in priority order (or fastest-first with `prefer_fastest`), skipping those
+    whose circuit breaker is open. A failing provider falls through to the next one. When every
+    circuit is open (or its single half-open trial is already in flight), requests fail fast with
+    LLMRequestError instead of reaching the backends, which also holds with a single provider. When
+    `hedge_percentile` is set, a request that is still running after that latency percentile of
+    the current provider is duplicated on the next provider and the first success wins.
+    """
+
+    def __init__(self, providers: List[Tuple[str, LLM]], hedge_percentile: Optional[float] = None,
+                 min_hedge_samples: int = 20, prefer_fastest: bool = False, window_size: int = 100,
+                 failure_threshold: int = 3, reset_timeout: float = 30.0, max_workers: int = 8):
+        """
+        :param providers: List of (name, llm) pairs, already configured, in priority order.
+        :param hedge_percentile: Latency percentile (0-100) after which a hedged request is sent, or None to disable.
+        :param min_hedge_samples: Minimum successful calls recorded for a provider before hedging on it.
+        :param prefer_fastest: Order healthy providers by median latency instead of priority.
+        :param window_size: Number of recent calls kept per provider.
+        :param failure_threshold: Consecutive failures that open a provider's circuit.
+        :param reset_timeout: Seconds before an open circuit allows a trial request.
+        :param max_workers: Size of the thread pool used to run provider calls.
+        """
+        if not providers:
+            raise ValueError("At least one provider must be given.")
+        self.providers = list(providers)
+        self.hedge_percentile = hedge_percentile
+        self.min_hedge_samples = min_hedge_samples
+        self.prefer_fastest = prefer_fastest
+        self.stats = {
+            name: ProviderStats(window_size, failure_threshold, reset_timeout)
+            for name, _ in self.providers
+        }
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def configure(self, api_key: str = None, **kwargs):
+        """
+        Configure the router. Providers are expected to be configured individually before being added.
+
+        :param api_key: (Not used, included for compatibility).
+        :param kwargs: Optional `hedge_percentile` and `prefer_fastest` overrides.
+        """
+        self.hedge_percentile = kwargs.get("hedge_percentile", self.hedge_percentile)
+        self.prefer_fastest = kwargs.get("prefer_fastest", self.prefer_fastest)
+
+    def generate_content(self, prompt: str) -> str:
+        """
+        Generate content using the best available provider, falling back and hedging as configured.
+
+        :param prompt: The text prompt to generate content for.
+        :return: The generated content as a string.
+        :raises LLMRequestError: If every provider fails or no provider's circuit lets the request through.
+        """
+        candidates = self._ranked_providers()
+        if not candidates:
+            raise LLMRequestError("No provider available: every circuit breaker is open.")
+        pending = {}
+        errors = []
+        next_index = 0
+
+        def launch():
+            nonlocal next_index
+            # The circuit is only moved to half-open once its trial request is actually sent;
+            # a provider whose trial another request already took is skipped.
+            while next_index < len(candidates):
+                name, llm = candidates[next_index]
+                next_index += 1
+                if self.stats[name].acquire():
+                    pending[self.executor.submit(self._call, name, llm, prompt)] = name
+                    return
+                errors.append(f"{name}: circuit open")
+
+        launch()
+        while pending:
+            timeout = None
+            if next_index < len(candidates):
+                timeout = self._hedge_delay(candidates[next_index - 1][0])
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # The current request is slower than its usual tail latency: hedge on the next provider.
+                launch()
+                continue
+            for future in done:
+                name = pending.pop(future)
+                try:
+                    return future.result()
+                except Exception as e:
+                    errors.append(f"{name}: {e}")
+            if not pending and next_index < len(candidates):
+                launch()
+
+        raise LLMRequestError("All providers failed: " + "; ".join(errors))
+
+    def get_stats(self) -> dict:
+        """
+        :return: A dictionary mapping provider names to their current statistics.
+        """
+        return {name: stats.snapshot() for name, stats in self.stats.items()}
+
+    def _call(self, name: str, llm: LLM, prompt: str) -> str:
+        start = time.monotonic()
+        try:
+            result = llm.generate_content(prompt)
+        except Exception:
+            self.stats[name].record_failure(time.monotonic() - start)
+            raise
+        self.stats[name].record_success(time.monotonic() - start)
+        return result
+
+    def _ranked_providers(self) -> List[Tuple[str, LLM]]:
+        available = [(name, llm) for name, llm in self.providers if self.stats[name].is_available()]
+        if self.prefer_fastest:
+            def median_latency(provider):
+                p50 = self.stats[provider[0]].latency_percentile(50)
+                return float("inf") if p50 is None else p50
+            available.sort(key=median_latency)
+        return available
+
+    def _hedge_delay(self, name: str) -> Optional[float]:
+        if self.hedge_percentile is None:
+            return None
+        stats = self.stats[name]
+        if stats.sample_count() < self.min_hedge_samples:
+            return None
+        return stats.latency_percentile(self.hedge_percentile)
+
+
 # Example usage of the CustomLLM class
 if __name__ == "__main__":
+    from dotenv import load_dotenv
+
     # Initialize the LLM with the API URL
     load_dotenv()
     custom_llm = CustomLLM("https://j0aoonwgxl.execute-api.eu-north-1.amazonaws.com/dev")
@@ -1,6 +1,6 @@
-from llm import GeminiLLM
-from chroma_text_processing import ChromaInterface
-from chroma_text_processing import TextSplitter, RecursiveCharacterTextSplitterAdapter, NLTKTextSplitterAdapter, CustomSentenceTransformerEmbedding, ChromaInterface
+import os
+from chroma_text_processing import ChromaInterface, CollectionRouter
+from tracing import NULL_TRACE, approximate_token_count
 
 
 class LLMHandler:
@@ -139,29 +139,125 @@ class LLMHandler:
     }
 
 
-    def __init__(self, collection_name, db_path, llm, template_name='default_en'):
+    def __init__(self, collection_name, db_path, llm, template_name='default_en', text_splitter=None,
+                 collection_summaries=None, max_collections=2, n_results=30, memory=None,
+                 answer_store=None):
+        """
+        :param collection_name: A collection name, or a list of names to serve several subjects from one
+            handler. With a list, each query is routed to the best `max_collections` collections first.
+        :param collection_summaries: Optional dict of collection name to a short subject description, used for routing.
+        :param n_results: Number of chunks retrieved per query.
+        :param memory: Optional ConversationMemory used to answer follow-up questions in context.
+        :param answer_store: Optional AnswerStore of pre-generated answers, checked before retrieval.
+        """
         self.llm = llm
-        # Initialize the interface
-        text_splitter = RecursiveCharacterTextSplitterAdapter(chunk_size=200, chunk_overlap=20)
-        self.chroma_interface = ChromaInterface(collection_name, db_path, text_splitter=text_splitter)
+        self.memory = memory
+        self.answer_store = answer_store
+        self.n_results = n_results
+        self.max_collections = max_collections
+        # The splitter is only used when adding documents, so answering queries doesn't need
+        # to pay for loading langchain unless a splitter is passed in explicitly.
+        collection_names = [collection_name] if isinstance(collection_name, str) else list(collection_name)
+        self.chroma_interface = ChromaInterface(collection_names[0], db_path, text_splitter=text_splitter)
+        self.router = None
+        if len(collection_names) > 1:
+            # All collections share the client and embedding model of the first interface
+            interfaces = {collection_names[0]: self.chroma_interface}
+            for name in collection_names[1:]:
+                interfaces[name] = ChromaInterface(
+                    name, db_path, text_splitter=text_splitter,
+                    client=self.chroma_interface.client,
+                    embedding_function=self.chroma_interface.embedding_function
+                )
+            self.router = CollectionRouter(
+                interfaces, summaries=collection_summaries,
+                cache_path=os.path.join(db_path, "collection_centroids.json")
+            )
         self.template = self.PROMPT_TEMPLATES.get(template_name, self.PROMPT_TEMPLATES['default_en'])
 
-    def generate_response(self, query):
+    def generate_response(self, query, trace=NULL_TRACE, chat_id=None):
+        # Follow-ups like "explain more" are expanded with the previous question before retrieval
+        history = []
+        retrieval_query = query
+        if self.memory is not None and chat_id is not None:
+            history = self.memory.get_turns(chat_id)
+            retrieval_query = self.memory.condense_query(chat_id, query)
+
+        # Embed the query once; it is used for the answer store lookup and for retrieval
+        with trace.stage("query_embedding"):
+            query_embedding = self.chroma_interface.embed_query(retrieval_query)
+
+        # Pre-generated answers only apply to standalone questions, not follow-ups
+        if self.answer_store is not None and retrieval_query == query:
+            with trace.stage("answer_lookup"):
+                stored_answer = self.answer_store.lookup(query_embedding)
+            trace.set("answer_store_hit", int(stored_answer is not None))
+            if stored_answer is not None:
+                if self.memory is not None and chat_id is not None:
+                    self.memory.add_turn(chat_id, retrieval_query, stored_answer)
+                return stored_answer
+
         # Retrieve relevant information from Chroma
-        query_results = self.chroma_interface.query(query)
-        print(f"query_results == {query_results}")
+        query_results = self._retrieve(retrieval_query, query_embedding, trace)
+
         # Construct the prompt
-        prompt = self._construct_prompt(query, query_results)
+        with trace.stage("prompt_build"):
+            prompt = self._construct_prompt(query, query_results, history)
+        if trace.enabled:
+            trace.set("retrieved_chunks", len(query_results))
+            trace.set("prompt_tokens", approximate_token_count(prompt))
 
         # Generate response using the LLM
-        response = self.llm.generate_content(prompt)
+        with trace.stage("llm"):
+            response = self.llm.generate_content(prompt)
 
+        if self.memory is not None and chat_id is not None:
+            self.memory.add_turn(chat_id, retrieval_query, response)
         return response
 
-    def _construct_prompt(self, query, context):
+    def _retrieve(self, query, query_embedding, trace=NULL_TRACE):
+        if self.router is None:
+            with trace.stage("vector_search"):
+                documents, _ = self.chroma_interface.query_by_embedding(query_embedding, self.n_results)
+            return documents
+
+        with trace.stage("collection_routing"):
+            selected = self.router.route(query_embedding, max_collections=self.max_collections)
+        if trace.enabled:
+            trace.set("collections", [name for name, _ in selected])
+
+        # Collections indexed with a different normalisation setting than the first one need their own
+        # query embedding; it is computed at most once per setting.
+        embeddings = {self.chroma_interface.normalize: query_embedding}
+        for name, _ in selected:
+            interface = self.router.interfaces[name]
+            if interface.normalize not in embeddings:
+                with trace.stage("query_embedding"):
+                    embeddings[interface.normalize] = interface.embed_query(query)
+
+        with trace.stage("vector_search"):
+            if len(selected) == 1:
+                interface = self.router.interfaces[selected[0][0]]
+                documents, _ = interface.query_by_embedding(embeddings[interface.normalize], self.n_results)
+                return documents
+            # Merge the per-collection results by distance
+            scored = []
+            for name, _ in selected:
+                interface = self.router.interfaces[name]
+                documents, distances = interface.query_by_embedding(embeddings[interface.normalize], self.n_results)
+                scored.extend(zip(distances, documents))
+            scored.sort(key=lambda item: item[0])
+            return [document for _, document in scored[:self.n_results]]
+
+    def _construct_prompt(self, query, context, history=None):
         # Merge context information into a single string, with each item on a new line
         context_str = "\n".join(f"- {item}" for item in context)
 
+        # Prepend the recent conversation so the LLM can resolve follow-up questions
+        if history:
+            turns = "\n".join(f"Q: {question}\nA: {answer}" for question, answer in history)
+            query = f"{turns}\nQ: {query}"
+
         # Fill the selected template
         prompt = self.template.format(context=context_str, query=query)
         
@@ -1,48 +1,139 @@
-from bot import TelegramBot
-from llm_handler import LLMHandler
-from llm import GeminiLLM ,TitanLLM, ClaudeLLM, CustomLLM
-from chroma_text_processing import TextSplitter, RecursiveCharacterTextSplitterAdapter, NLTKTextSplitterAdapter, CustomSentenceTransformerEmbedding, ChromaInterface
 from dotenv import load_dotenv
 import os
+import time
 
 
+class StartupTimer:
+    """
+    Records how long each startup phase takes and prints a short report,
+    so slow restarts can be traced to a specific import or initialisation step.
+    """
+
+    def __init__(self):
+        self.start_time = time.perf_counter()
+        self.last_time = self.start_time
+        self.phases = []
+
+    def mark(self, phase: str):
+        """
+        Records the time elapsed since the previous mark under the given phase name.
+
+        Args:
+            phase (str): Name of the phase that just finished.
+        """
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last_time))
+        self.last_time = now
+
+    def report(self) -> str:
+        total = self.last_time - self.start_time
+        lines = [f"{phase:<20} {duration:8.3f}s" for phase, duration in self.phases]
+        lines.append(f"{'total':<20} {total:8.3f}s")
+        return "Startup timing:\n" + "\n".join(lines)
+
+
+def build_llm(provider: str):
+    """
+    Builds the configured LLM. Provider modules are only imported for the selected provider.
+
+    Args:
+        provider (str): One of 'custom', 'gemini', 'titan', 'claude' or 'router'
+            (custom endpoint with Gemini as fallback when GEMINI_API_KEY is set).
+    """
+    from llm import CustomLLM, GeminiLLM, TitanLLM, ClaudeLLM, RouterLLM
+
+    gemini_api_key = os.getenv("GEMINI_API_KEY")
+
+    if provider == "gemini":
+        llm = GeminiLLM(model_name='gemini-1.0-pro-latest')
+        llm.configure(api_key=gemini_api_key)
+        return llm
+    if provider == "titan":
+        llm = TitanLLM()
+        llm.configure(region_name='us-west-2', model_id="amazon.titan-text-express-v1")
+        return llm
+    if provider == "claude":
+        llm = ClaudeLLM()
+        llm.configure(region_name='us-west-2', model_id="arn:aws:bedrock:us-west-2::foundation-model/anthropic.claude-instant-v1")
+        return llm
+
+    # LLM_TIMEOUT bounds how long a request to the custom endpoint may take (seconds)
+    custom_llm = CustomLLM("https://j0aoonwgxl.execute-api.eu-north-1.amazonaws.com/dev",
+                           timeout=float(os.getenv("LLM_TIMEOUT", "60")))
+    # Configure the LLM with the API token
+    auth_token = os.getenv("AUTH_TOKEN_AWS")
+    custom_llm.configure(auth_token=auth_token)
+    if provider == "custom":
+        return custom_llm
+
+    providers = [("custom", custom_llm)]
+    # Gemini acts as a fallback / hedge target when a key is available
+    if gemini_api_key:
+        gemini_llm = GeminiLLM(model_name='gemini-1.0-pro-latest')
+        gemini_llm.configure(api_key=gemini_api_key)
+        providers.append(("gemini", gemini_llm))
+    return RouterLLM(providers, hedge_percentile=95)
+
 
 def main():
+    timer = StartupTimer()
     # Load environment variables from .env file
     load_dotenv()
+    timer.mark("load_env")
 
     telegram_token = os.getenv("TELEGRAM_TOKEN")
-    # gemini_api_key = os.getenv("GEMINI_API_KEY")
-    
-    bot = TelegramBot(telegram_token)
-    collection_name = "taw_bio"
+    provider = os.getenv("LLM_PROVIDER", "router")
+    # COLLECTIONS="taw_bio,taw_hist,taw_religion" serves several subjects from one bot
+    collection_name = os.getenv("COLLECTIONS", "taw_bio").split(",")
+    collection_summaries = {
+        "taw_bio": "العلوم الحياتية: الخلية، البناء الضوئي، التنفس الخلوي، الوراثة، التقانات الحيوية، المناعة",
+        "taw_hist": "التاريخ: الحضارات، الدول، الأحداث والمعارك التاريخية، القضية الفلسطينية",
+        "taw_religion": "التربية الإسلامية: القرآن الكريم، الحديث الشريف، العقيدة، الفقه، السيرة النبوية",
+    }
     db_path = "DB/chroma_db"
-    # Instantiate and configure GeminiLLM
-    #llm = GeminiLLM(model_name='gemini-1.0-pro-latest')
-    #llm.configure(api_key=gemini_api_key)
 
+    # Per-request tracing: TRACE_LOG enables JSON records, METRICS_PORT exposes /metrics
+    from tracing import Tracer
+    trace_log = os.getenv("TRACE_LOG")
+    metrics_port = os.getenv("METRICS_PORT")
+    tracer = Tracer(enabled=bool(trace_log or metrics_port), log_file=trace_log)
+    if metrics_port:
+        tracer.serve_metrics(int(metrics_port))
 
+    # TRAFFIC_LOG records anonymised incoming messages for traffic_replay.py
+    recorder = None
+    if os.getenv("TRAFFIC_LOG"):
+        from traffic_replay import TrafficRecorder
+        # TRAFFIC_LOG_SALT keeps chat hashes stable across restarts; without it a random salt is used per run
+        recorder = TrafficRecorder(os.getenv("TRAFFIC_LOG"), salt=os.getenv("TRAFFIC_LOG_SALT"))
 
-    # Step 1: Create an instance of the TitanLLM class
-    #llm = TitanLLM()
-    #llm.configure(region_name='us-west-2', model_id="amazon.titan-text-express-v1")
-# Example usage:
-    # llm = ClaudeLLM()
-    # llm.configure(region_name='us-west-2', model_id="arn:aws:bedrock:us-west-2::foundation-model/anthropic.claude-instant-v1")
+    from bot import TelegramBot
+    bot = TelegramBot(telegram_token, tracer=tracer, recorder=recorder)
+    timer.mark("bot_init")
 
-    # llm = GeminiLLM(model_name='gemini-1.0-pro-latest')
-    # llm.configure(api_key=gemini_api_key)
-    llm  = CustomLLM("https://j0aoonwgxl.execute-api.eu-north-1.amazonaws.com/dev")
- # Configure the LLM with the API token
-    auth_token = os.getenv("AUTH_TOKEN_AWS")
-    llm.configure(auth_token=auth_token)
- 
+    llm = build_llm(provider)
+    timer.mark(f"llm_init ({provider})")
+
+    from llm_handler import LLMHandler
+    from conversation_memory import ConversationMemory
+    llm_handler = LLMHandler(collection_name, db_path, llm, template_name='detailed_ar',
+                             collection_summaries=collection_summaries, memory=ConversationMemory())
+    # Answers pre-generated offline by pregenerate_answers.py are served before running the RAG pipeline
+    if os.getenv("ANSWER_STORE"):
+        from answer_store import AnswerStore
+        llm_handler.answer_store = AnswerStore(
+            os.getenv("ANSWER_STORE"), db_path,
+            client=llm_handler.chroma_interface.client,
+            embedding_function=llm_handler.chroma_interface.embedding_function,
+            normalize=llm_handler.chroma_interface.normalize
+        )
+    timer.mark("retrieval_init")
 
-    # Step 2: Configure the instance with AWS credentials
-    llm_handler = LLMHandler(collection_name, db_path,llm,template_name= 'detailed_ar')
     bot.set_llm_handler(llm_handler)
     bot.start()
+    timer.mark("handlers")
+    print(timer.report())
     bot.run()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
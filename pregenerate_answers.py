@@ -0,0 +1,157 @@
+import argparse
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Tuple
+
+QUESTION_PROMPT = """
+اقرأ النص التالي من كتاب مدرسي، ثم اكتب {count} أسئلة مهمة قد يسألها الطلاب عنه قبل الامتحان.
+اكتب كل سؤال في سطر منفصل، دون ترقيم ودون إجابات.
+---------------------
+{section}
+---------------------
+الأسئلة:
+"""
+
+_LIST_MARKER = re.compile(r"^\s*(?:[-*•]|\d+[.)\-]|[٠-٩]+[.)\-])\s*")
+
+
+class RateLimiter:
+    """
+    Spaces out calls so that at most `rate` calls per second are started, across threads.
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_time = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+def load_sections(collection, section_size: int = 10) -> List[Tuple[str, str]]:
+    """
+    Reads every chunk of a collection in document order and groups consecutive chunks into sections.
+
+    Args:
+        collection: The ChromaDB collection holding the book's chunks.
+        section_size (int): Number of consecutive chunks per section.
+
+    Returns:
+        List[Tuple[str, str]]: (section id, section text) pairs.
+    """
+    data = collection.get(include=["documents", "metadatas"])
+
+    # Chunks added from a ChunkStore carry their chunk number in the metadata; otherwise the ids
+    # ('<file>_<n>', or '<store>_<chunk>_<n>') are compared with their numbers as integers
+    def order(item):
+        chunk_id, _, metadata = item
+        metadata = metadata or {}
+        id_key = [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", chunk_id)]
+        return (str(metadata.get("source", "")), metadata.get("chunk", -1), id_key)
+
+    chunks = [(chunk_id, text) for chunk_id, text, _ in
+              sorted(zip(data["ids"], data["documents"], data["metadatas"]), key=order)]
+    sections = []
+    for start in range(0, len(chunks), section_size):
+        group = chunks[start:start + section_size]
+        sections.append((f"{group[0][0]}..{group[-1][0]}", "\n".join(text for _, text in group)))
+    return sections
+
+
+def parse_questions(text: str, limit: int) -> List[str]:
+    questions = []
+    for line in text.splitlines():
+        line = _LIST_MARKER.sub("", line).strip()
+        if len(line.split()) >= 3:
+            questions.append(line)
+    return questions[:limit]
+
+
+def pregenerate(llm, llm_handler, answer_store, sections: List[Tuple[str, str]], questions_per_section: int = 5,
+                concurrency: int = 4, rate: float = 2.0):
+    """
+    Generates questions for each section and answers them through the full RAG pipeline.
+
+    Args:
+        llm (LLM): Model used to write the questions.
+        llm_handler (LLMHandler): Handler used to answer them (should not itself use the answer store).
+        answer_store (AnswerStore): Where the answers are saved; questions already stored are skipped.
+        sections (List[Tuple[str, str]]): (section id, text) pairs, see load_sections.
+        questions_per_section (int): Number of questions requested per section.
+        concurrency (int): Number of LLM calls in flight.
+        rate (float): Maximum LLM calls started per second.
+    """
+    limiter = RateLimiter(rate)
+
+    def generate_questions(section_id, section):
+        limiter.wait()
+        prompt = QUESTION_PROMPT.format(count=questions_per_section, section=section)
+        return section_id, parse_questions(llm.generate_content(prompt), questions_per_section)
+
+    def answer(section_id, question):
+        limiter.wait()
+        return section_id, question, llm_handler.generate_response(question)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending = []
+        seen = set()
+        for future in as_completed([executor.submit(generate_questions, *section) for section in sections]):
+            try:
+                section_id, questions = future.result()
+            except Exception as e:
+                print(f"Question generation failed: {e}")
+                continue
+            for question in questions:
+                if question not in seen and not answer_store.contains(question):
+                    seen.add(question)
+                    pending.append(executor.submit(answer, section_id, question))
+
+        done = 0
+        for future in as_completed(pending):
+            try:
+                section_id, question, response = future.result()
+            except Exception as e:
+                print(f"Answer generation failed: {e}")
+                continue
+            answer_store.add([question], [response], metadatas=[{"section": section_id}])
+            done += 1
+            print(f"Stored answer {done} of {len(pending)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-generate answers to likely questions for a collection.")
+    parser.add_argument("--collection", default="taw_bio")
+    parser.add_argument("--db-path", default="DB/chroma_db")
+    parser.add_argument("--template", default="detailed_ar")
+    parser.add_argument("--section-size", type=int, default=10)
+    parser.add_argument("--questions-per-section", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=2.0, help="Maximum LLM calls per second.")
+    parser.add_argument("--provider", default="router")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    from main import build_llm
+    from llm_handler import LLMHandler
+    from answer_store import AnswerStore
+
+    load_dotenv()
+    llm = build_llm(args.provider)
+    handler = LLMHandler(args.collection, args.db_path, llm, template_name=args.template)
+    store = AnswerStore(f"{args.collection}_answers", args.db_path,
+                        client=handler.chroma_interface.client,
+                        embedding_function=handler.chroma_interface.embedding_function,
+                        normalize=handler.chroma_interface.normalize)
+
+    start_time = time.time()
+    pregenerate(llm, handler, store, load_sections(handler.chroma_interface.collection, args.section_size),
+                args.questions_per_section, args.concurrency, args.rate)
+    print(f"Answer store now holds {store.count()} answers ({time.time() - start_time:.0f} seconds).")
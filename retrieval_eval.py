@@ -0,0 +1,198 @@
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+from benchmark import percentile
+
+DEFAULT_KS = (1, 5, 10, 30)
+
+
+def load_labeled_questions(path: str) -> List[dict]:
+    """
+    Loads a labeled question set: one JSON object per line with a 'question' and the
+    'answer' passage (copied from the corpus) that a relevant chunk must cover.
+
+    Args:
+        path (str): Path to the JSONL file.
+
+    Returns:
+        List[dict]: The labeled questions.
+    """
+    with open(path, 'r', encoding='utf-8') as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def is_relevant(chunk: str, answer: str, min_overlap: float = 0.5) -> bool:
+    """
+    Decides whether a retrieved chunk covers the labeled answer passage.
+
+    Chunk boundaries move with the splitter settings, so exact containment is too strict:
+    a chunk counts as relevant if it shares at least `min_overlap` of the words of the
+    shorter of the two texts.
+    """
+    if answer in chunk:
+        return True
+    chunk_words = set(chunk.split())
+    answer_words = set(answer.split())
+    if not chunk_words or not answer_words:
+        return False
+    shared = len(chunk_words & answer_words)
+    return shared / min(len(chunk_words), len(answer_words)) >= min_overlap
+
+
+def directory_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+def default_splitter_grid() -> List[Tuple[str, object]]:
+    """
+    Splitter configurations evaluated when none are given explicitly.
+    """
+    from chroma_text_processing import RecursiveCharacterTextSplitterAdapter, NLTKTextSplitterAdapter, ArabicTextSplitter
+
+    grid = []
+    for chunk_size, chunk_overlap in [(200, 20), (400, 40), (800, 80), (1200, 120)]:
+        grid.append((f"recursive_{chunk_size}_{chunk_overlap}",
+                     RecursiveCharacterTextSplitterAdapter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)))
+    grid.append(("nltk", NLTKTextSplitterAdapter()))
+    for chunk_size, chunk_overlap in [(400, 40), (800, 80)]:
+        grid.append((f"arabic_{chunk_size}_{chunk_overlap}",
+                     ArabicTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)))
+    return grid
+
+
+def time_split(text_splitter, file_paths: List[str], repeats: int = 3) -> Tuple[float, int]:
+    """
+    Times `split_text` alone over the corpus, without embedding or indexing.
+
+    Args:
+        text_splitter (TextSplitter): Splitter to time.
+        file_paths (List[str]): Corpus files to split.
+        repeats (int): Number of timed passes; the fastest is reported.
+
+    Returns:
+        Tuple[float, int]: Seconds for one pass over the corpus, and the corpus size in bytes.
+    """
+    texts = []
+    for file_path in file_paths:
+        with open(file_path, 'r', encoding='utf-8') as file:
+            texts.append(file.read())
+    size = sum(len(text.encode('utf-8')) for text in texts)
+
+    best = float("inf")
+    for _ in range(max(repeats, 1)):
+        start = time.perf_counter()
+        for text in texts:
+            text_splitter.split_text(text)
+        best = min(best, time.perf_counter() - start)
+    return best, size
+
+
+def evaluate_splitter(name: str, text_splitter, file_paths: List[str], questions: List[dict],
+                      ks=DEFAULT_KS, work_dir: Optional[str] = None) -> Dict[str, object]:
+    """
+    Builds a temporary index with the given splitter and measures retrieval quality and cost.
+
+    Args:
+        name (str): Label for the configuration.
+        text_splitter (TextSplitter): Splitter used to chunk the corpus.
+        file_paths (List[str]): Corpus files to index.
+        questions (List[dict]): Labeled questions (see load_labeled_questions).
+        ks: Cut-offs at which recall is reported; the largest is used as n_results.
+        work_dir (Optional[str]): Parent directory for the temporary index.
+
+    Returns:
+        Dict[str, object]: recall@k, MRR, chunk count, index size, split time, build time
+            (splitting plus embedding) and query latency.
+    """
+    from chroma_text_processing import ChromaInterface
+
+    split_time, _ = time_split(text_splitter, file_paths)
+    index_dir = tempfile.mkdtemp(prefix=f"eval_{name}_", dir=work_dir)
+    try:
+        chroma_interface = ChromaInterface(f"eval_{name}", index_dir, text_splitter=text_splitter)
+
+        start = time.perf_counter()
+        chroma_interface.add_documents_from_files(file_paths)
+        build_time = time.perf_counter() - start
+
+        max_k = max(ks)
+        hits = {k: 0 for k in ks}
+        reciprocal_ranks = []
+        latencies = []
+        for item in questions:
+            start = time.perf_counter()
+            results = chroma_interface.query(item["question"], n_results=max_k)
+            latencies.append(time.perf_counter() - start)
+
+            rank = next((i + 1 for i, chunk in enumerate(results) if is_relevant(chunk, item["answer"])), None)
+            reciprocal_ranks.append(1.0 / rank if rank else 0.0)
+            for k in ks:
+                if rank and rank <= k:
+                    hits[k] += 1
+
+        report = {
+            "config": name,
+            "chunks": chroma_interface.collection.count(),
+            "index_bytes": directory_size(index_dir),
+            "split_seconds": split_time,
+            "build_seconds": build_time,
+            "query_p50": percentile(latencies, 50),
+            "query_p95": percentile(latencies, 95),
+            "mrr": sum(reciprocal_ranks) / max(len(reciprocal_ranks), 1),
+        }
+        for k in ks:
+            report[f"recall@{k}"] = hits[k] / max(len(questions), 1)
+        return report
+    finally:
+        shutil.rmtree(index_dir, ignore_errors=True)
+
+
+def format_results(results: List[Dict[str, object]], ks=DEFAULT_KS) -> str:
+    header = f"{'config':<22}{'chunks':>8}{'size MB':>9}{'split ms':>10}{'build s':>9}{'q p50 ms':>10}{'q p95 ms':>10}{'MRR':>7}"
+    header += "".join(f"{'R@' + str(k):>7}" for k in ks)
+    lines = [header]
+    for r in results:
+        line = (f"{r['config']:<22}{r['chunks']:>8}{r['index_bytes'] / 1e6:>9.1f}"
+                f"{r['split_seconds'] * 1000:>10.1f}{r['build_seconds']:>9.1f}"
+                f"{r['query_p50'] * 1000:>10.1f}{r['query_p95'] * 1000:>10.1f}{r['mrr']:>7.3f}")
+        line += "".join(f"{r[f'recall@{k}']:>7.2f}" for k in ks)
+        lines.append(line)
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare splitter settings on retrieval quality and latency.")
+    parser.add_argument("--files", nargs="+", default=["corrected_bio.txt"], help="Corpus files (corrected_*.txt).")
+    parser.add_argument("--questions", default="retrieval_eval_questions.jsonl", help="Labeled question set (JSONL).")
+    parser.add_argument("--ks", nargs="+", type=int, default=list(DEFAULT_KS))
+    parser.add_argument("--output", help="Optional JSON file to write the raw results to.")
+    parser.add_argument("--split-only", action="store_true",
+                        help="Only time split_text for each configuration (no embedding or index build).")
+    args = parser.parse_args()
+
+    if args.split_only:
+        # split_text alone, so native splitters can be compared with the LangChain adapter without embedding cost
+        print(f"{'config':<22}{'split ms':>10}{'MB/s':>9}")
+        for name, splitter in default_splitter_grid():
+            seconds, size = time_split(splitter, args.files)
+            print(f"{name:<22}{seconds * 1000:>10.1f}{size / 1e6 / max(seconds, 1e-9):>9.1f}")
+    else:
+        questions = load_labeled_questions(args.questions)
+        results = []
+        for name, splitter in default_splitter_grid():
+            print(f"Evaluating {name}...")
+            results.append(evaluate_splitter(name, splitter, args.files, questions, ks=args.ks))
+
+        print(format_results(results, ks=args.ks))
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as file:
+                json.dump(results, file, indent=2)
@@ -27,6 +27,9 @@ class PDFTextExtractor:
         """
         self.dpi = dpi
         self.language = language
+        # Resolve the log file once instead of re-reading the .env file on every write
+        load_dotenv()
+        self.log_file = os.getenv('LOG_FILE')
 
     def convert_pdf_to_images(self, pdf_path: str):
         """
@@ -59,9 +62,7 @@ class PDFTextExtractor:
         Args:
             log_message (str): The message containing runtime information.
         """
-        load_dotenv()
-        log_file = os.getenv('LOG_FILE')
-        with open(log_file, 'a') as log:
+        with open(self.log_file, 'a') as log:
             log.write(log_message)
 
     def process_pdf(self, pdf_path: str, output_path: str):
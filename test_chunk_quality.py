@@ -0,0 +1,29 @@
+import pytest
+
+from chunk_quality import CharNgramModel, ChunkQualityScorer
+
+CLEAN = "الخلية هي الوحدة الأساسية في بناء جسم الكائن الحي. تتكون الخلية من الغشاء البلازمي والسيتوبلازم والنواة."
+
+
+def make_scorer():
+    model = CharNgramModel(table_bits=12)
+    model.train([CLEAN * 5])
+    return ChunkQualityScorer(model)
+
+
+@pytest.mark.parametrize("extra_corrected, extra_ocr", [(2, 0), (0, 2)])
+def test_rank_handles_ocr_and_corrected_lists_of_different_lengths(extra_corrected, extra_ocr):
+    corrected = [CLEAN, CLEAN[:60]] + ["x" * 10] * extra_corrected
+    ocr = [CLEAN, CLEAN[:50]] + [CLEAN] * extra_ocr
+    ranked = make_scorer().rank(corrected, ocr)
+    assert sorted(report["chunk"] for report in ranked) == list(range(len(corrected)))
+    assert all("edit_ratio" in report for report in ranked)
+
+
+def test_rank_puts_noise_first():
+    ranked = make_scorer().rank([CLEAN, CLEAN, "#@$ 123 ~~ ||| ^^^ %%%"])
+    assert ranked[0]["chunk"] == 2
+
+
+def test_rank_empty_input():
+    assert make_scorer().rank([], []) == []
@@ -0,0 +1,26 @@
+import pytest
+
+from conversation_memory import ConversationMemory
+
+
+@pytest.mark.parametrize("query", ["اشرح أكثر", "ولماذا؟", "وضّح ذلك", "explain more", "why?", "what about it?"])
+def test_follow_ups_are_detected(query):
+    assert ConversationMemory().is_follow_up(query)
+
+
+@pytest.mark.parametrize("query", [
+    "ما هي مكونات الدم؟",
+    "لماذا تنقسم الخلايا الجسمية انقساما متساويا؟",
+    "اشرح عملية البناء الضوئي.",
+    "Moreover, what is DNA?",
+])
+def test_standalone_questions_are_not_follow_ups(query):
+    assert not ConversationMemory().is_follow_up(query)
+
+
+def test_condense_query_only_expands_follow_ups():
+    memory = ConversationMemory()
+    memory.add_turn(1, "ما هي مكونات الدم؟", "...")
+    assert memory.condense_query(1, "اشرح أكثر") == "ما هي مكونات الدم؟ اشرح أكثر"
+    assert memory.condense_query(1, "ما وظيفة الميتوكوندريا؟") == "ما وظيفة الميتوكوندريا؟"
+    assert memory.condense_query(2, "اشرح أكثر") == "اشرح أكثر"
@@ -0,0 +1,142 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from llm import LLM, LLMRequestError, ProviderStats, RouterLLM
+
+
+class FakeLLM(LLM):
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.calls = 0
+
+    def configure(self, api_key: str = None, **kwargs):
+        pass
+
+    def generate_content(self, prompt: str) -> str:
+        self.calls += 1
+        if self.fail:
+            raise LLMRequestError("boom")
+        return f"answer to {prompt}"
+
+
+def open_circuit(stats: ProviderStats):
+    for _ in range(stats.failure_threshold):
+        stats.record_failure(0.01)
+
+
+def test_circuit_opens_after_consecutive_failures():
+    stats = ProviderStats(failure_threshold=2, reset_timeout=60)
+    stats.record_failure(0.01)
+    assert stats.state == ProviderStats.CLOSED
+    stats.record_failure(0.01)
+    assert stats.state == ProviderStats.OPEN
+    assert not stats.is_available()
+    assert not stats.acquire()
+
+
+def test_checking_availability_does_not_move_to_half_open():
+    stats = ProviderStats(failure_threshold=1, reset_timeout=0.05)
+    open_circuit(stats)
+    time.sleep(0.06)
+    assert stats.is_available()
+    assert stats.is_available()
+    assert stats.state == ProviderStats.OPEN
+
+
+def test_half_open_trial_success_closes_circuit():
+    stats = ProviderStats(failure_threshold=1, reset_timeout=0.05)
+    open_circuit(stats)
+    time.sleep(0.06)
+    assert stats.acquire()
+    assert stats.state == ProviderStats.HALF_OPEN
+    # Only one trial request is let through while it is in flight
+    assert not stats.acquire()
+    stats.record_success(0.01)
+    assert stats.state == ProviderStats.CLOSED
+
+
+def test_half_open_trial_failure_reopens_circuit():
+    stats = ProviderStats(failure_threshold=3, reset_timeout=0.05)
+    open_circuit(stats)
+    time.sleep(0.06)
+    assert stats.acquire()
+    stats.record_failure(0.01)
+    assert stats.state == ProviderStats.OPEN
+    assert not stats.is_available()
+
+
+def test_router_does_not_strand_unused_provider_in_half_open():
+    primary, fallback = FakeLLM(), FakeLLM()
+    router = RouterLLM([("a", primary), ("b", fallback)], failure_threshold=1, reset_timeout=0.05)
+    open_circuit(router.stats["a"])
+    open_circuit(router.stats["b"])
+    time.sleep(0.06)
+
+    assert router.generate_content("q") == "answer to q"
+    assert router.stats["a"].state == ProviderStats.CLOSED
+    # The fallback was never called, so its circuit must still allow a trial later
+    assert fallback.calls == 0
+    assert router.stats["b"].state == ProviderStats.OPEN
+    assert router.stats["b"].is_available()
+
+
+def test_router_falls_back_and_recovers_after_reset_timeout():
+    primary, fallback = FakeLLM(fail=True), FakeLLM()
+    router = RouterLLM([("a", primary), ("b", fallback)], failure_threshold=1, reset_timeout=0.05)
+
+    assert router.generate_content("q") == "answer to q"
+    assert router.stats["a"].state == ProviderStats.OPEN
+    assert router.generate_content("q") == "answer to q"
+    assert primary.calls == 1
+
+    primary.fail = False
+    time.sleep(0.06)
+    assert router.generate_content("q") == "answer to q"
+    assert primary.calls == 2
+    assert router.stats["a"].state == ProviderStats.CLOSED
+
+
+def test_router_raises_when_every_provider_fails():
+    router = RouterLLM([("a", FakeLLM(fail=True)), ("b", FakeLLM(fail=True))], failure_threshold=1)
+    with pytest.raises(LLMRequestError, match="a: boom"):
+        router.generate_content("q")
+
+
+def test_router_fails_fast_while_every_circuit_is_open():
+    provider = FakeLLM(fail=True)
+    router = RouterLLM([("only", provider)], failure_threshold=1, reset_timeout=60)
+    with pytest.raises(LLMRequestError, match="boom"):
+        router.generate_content("q")
+    with pytest.raises(LLMRequestError, match="circuit"):
+        router.generate_content("q")
+    assert provider.calls == 1
+
+
+def test_half_open_lets_a_single_concurrent_trial_through():
+    started = threading.Event()
+    release = threading.Event()
+
+    class SlowLLM(FakeLLM):
+        def generate_content(self, prompt: str) -> str:
+            self.calls += 1
+            started.set()
+            release.wait(5)
+            return "ok"
+
+    provider = SlowLLM()
+    router = RouterLLM([("only", provider)], failure_threshold=1, reset_timeout=0.05)
+    open_circuit(router.stats["only"])
+    time.sleep(0.06)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        trial = executor.submit(router.generate_content, "q")
+        assert started.wait(5)
+        with pytest.raises(LLMRequestError, match="circuit"):
+            router.generate_content("q")
+        release.set()
+        assert trial.result(5) == "ok"
+    assert provider.calls == 1
+    assert router.stats["only"].state == ProviderStats.CLOSED
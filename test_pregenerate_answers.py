@@ -0,0 +1,33 @@
+import random
+
+from pregenerate_answers import load_sections, parse_questions
+
+
+class StubCollection:
+    def __init__(self, ids, metadatas):
+        self.ids = ids
+        self.metadatas = metadatas
+
+    def get(self, include):
+        return {"ids": self.ids, "documents": list(self.ids), "metadatas": self.metadatas}
+
+
+def test_sections_follow_chunk_store_numbering():
+    ids = [f"correct_bio.pack_{chunk}_{n}" for chunk in range(12) for n in range(2)]
+    random.Random(0).shuffle(ids)
+    metadatas = [{"source": "correct_bio.pack", "chunk": int(chunk_id.split("_")[2])} for chunk_id in ids]
+    sections = load_sections(StubCollection(ids, metadatas), section_size=4)
+    assert sections[0][0] == "correct_bio.pack_0_0..correct_bio.pack_1_1"
+    assert sections[-1][0] == "correct_bio.pack_10_0..correct_bio.pack_11_1"
+
+
+def test_sections_order_file_ids_numerically():
+    ids = [f"corrected_bio.txt_{n}" for n in (10, 2, 1, 0, 11, 3)]
+    sections = load_sections(StubCollection(ids, [None] * len(ids)), section_size=3)
+    assert [section_id for section_id, _ in sections] == [
+        "corrected_bio.txt_0..corrected_bio.txt_2", "corrected_bio.txt_3..corrected_bio.txt_11"]
+
+
+def test_parse_questions_strips_list_markers():
+    text = "1. ما هي وظيفة الميتوكوندريا؟\n- ما هي مكونات الدم؟\nقصير\n٣) كيف يحدث الانقسام المتساوي؟"
+    assert parse_questions(text, 2) == ["ما هي وظيفة الميتوكوندريا؟", "ما هي مكونات الدم؟"]
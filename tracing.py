@@ -0,0 +1,219 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+
+class RequestTrace:
+    """
+    Collects stage timings and attributes for a single bot request.
+
+    Stages are timed with the `stage` context manager, e.g.:
+
+        with trace.stage("vector_search"):
+            results = collection.query(...)
+    """
+
+    # Lets callers skip computing attributes that only matter when the trace is recorded
+    enabled = True
+
+    def __init__(self, tracer: "Tracer", request_id: Optional[str] = None):
+        """
+        Args:
+            tracer (Tracer): The tracer that will receive the finished record.
+            request_id (Optional[str]): Identifier for the request (e.g. the chat id).
+        """
+        self.tracer = tracer
+        self.request_id = request_id
+        self.start_time = time.time()
+        self.stages: Dict[str, float] = {}
+        self.attributes: Dict[str, object] = {}
+        self.error: Optional[str] = None
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def set(self, key: str, value):
+        """
+        Attaches an attribute (e.g. context size in tokens) to the trace.
+        """
+        self.attributes[key] = value
+
+    def set_error(self, error: Exception):
+        self.error = f"{type(error).__name__}: {error}"
+
+    def finish(self):
+        """
+        Emits the trace as a structured record to the tracer.
+        """
+        self.tracer.record(self)
+
+    def to_record(self) -> dict:
+        return {
+            "request_id": self.request_id,
+            "timestamp": self.start_time,
+            "stages": {name: round(duration, 6) for name, duration in self.stages.items()},
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NullTrace:
+    """
+    Trace used when tracing is disabled; every method is a no-op.
+    """
+
+    enabled = False
+
+    class _NullStage:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc, tb):
+            return False
+
+    _null_stage = _NullStage()
+
+    def stage(self, name: str):
+        return self._null_stage
+
+    def set(self, key: str, value):
+        pass
+
+    def set_error(self, error: Exception):
+        pass
+
+    def finish(self):
+        pass
+
+
+NULL_TRACE = _NullTrace()
+
+
+class Tracer:
+    """
+    Creates request traces and turns finished ones into JSON log lines and Prometheus-style metrics.
+
+    When disabled, `start_trace` returns a shared no-op trace so instrumented code costs
+    little more than a method call.
+    """
+
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self, enabled: bool = True, log_file: Optional[str] = None, buckets=DEFAULT_BUCKETS):
+        """
+        Args:
+            enabled (bool): Whether traces are collected at all.
+            log_file (Optional[str]): File to append one JSON record per request to, or None to skip.
+            buckets: Upper bounds (seconds) of the latency histogram buckets.
+        """
+        self.enabled = enabled
+        self.log_file = log_file
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # Separate from the metrics lock so a slow disk never blocks other requests or /metrics
+        self._log_lock = threading.Lock()
+        self._stage_counts: Dict[str, List[int]] = {}
+        self._stage_sums: Dict[str, float] = {}
+        self._attribute_sums: Dict[str, float] = {}
+        self._requests_total = 0
+        self._errors_total = 0
+
+    def start_trace(self, request_id: Optional[str] = None):
+        if not self.enabled:
+            return NULL_TRACE
+        return RequestTrace(self, request_id)
+
+    def record(self, trace: RequestTrace):
+        with self._lock:
+            self._requests_total += 1
+            if trace.error:
+                self._errors_total += 1
+            for name, duration in trace.stages.items():
+                counts = self._stage_counts.setdefault(name, [0] * (len(self.buckets) + 1))
+                for i, bound in enumerate(self.buckets):
+                    if duration <= bound:
+                        counts[i] += 1
+                counts[-1] += 1  # +Inf bucket, also the total count
+                self._stage_sums[name] = self._stage_sums.get(name, 0.0) + duration
+            for key, value in trace.attributes.items():
+                if isinstance(value, (int, float)):
+                    self._attribute_sums[key] = self._attribute_sums.get(key, 0.0) + value
+        if self.log_file:
+            line = json.dumps(trace.to_record(), ensure_ascii=False) + "\n"
+            with self._log_lock:
+                with open(self.log_file, 'a', encoding='utf-8') as log:
+                    log.write(line)
+
+    def render_metrics(self) -> str:
+        """
+        Renders the collected metrics in the Prometheus text exposition format.
+        """
+        with self._lock:
+            return self._render_metrics_locked()
+
+    def _render_metrics_locked(self) -> str:
+        lines = [
+            "# TYPE bot_requests_total counter",
+            f"bot_requests_total {self._requests_total}",
+            "# TYPE bot_request_errors_total counter",
+            f"bot_request_errors_total {self._errors_total}",
+            "# TYPE bot_stage_seconds histogram",
+        ]
+        for name, counts in sorted(self._stage_counts.items()):
+            for bound, count in zip(self.buckets, counts):
+                lines.append(f'bot_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {count}')
+            lines.append(f'bot_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {counts[-1]}')
+            lines.append(f'bot_stage_seconds_sum{{stage="{name}"}} {self._stage_sums[name]}')
+            lines.append(f'bot_stage_seconds_count{{stage="{name}"}} {counts[-1]}')
+        if self._attribute_sums:
+            lines.append("# TYPE bot_attribute_total counter")
+            for key, total in sorted(self._attribute_sums.items()):
+                lines.append(f'bot_attribute_total{{name="{key}"}} {total}')
+        return "\n".join(lines) + "\n"
+
+    def serve_metrics(self, port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+        """
+        Starts a background HTTP server exposing the metrics at /metrics.
+
+        Args:
+            port (int): Port to listen on.
+            host (str): Interface to bind to.
+
+        Returns:
+            ThreadingHTTPServer: The running server (call `shutdown()` to stop it).
+        """
+        tracer = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = tracer.render_metrics().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+def approximate_token_count(text: str) -> int:
+    """
+    Cheap token estimate (whitespace-separated words) used for context size metrics.
+    """
+    return len(text.split())
@@ -0,0 +1,167 @@
+import argparse
+import hashlib
+import json
+import re
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from benchmark import CollectingTracer, RecordingSender, StubLLMServer, format_report, make_message, percentile
+
+_PHONE = re.compile(r"\+?\d[\d\s\-]{7,}\d")
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+
+
+class TrafficRecorder:
+    """
+    Appends anonymised incoming messages to a JSONL log for later load-test replay.
+
+    Chat ids are replaced by a salted hash (stable within one log, so conversations can be
+    replayed per chat) and phone numbers and e-mail addresses in the text are masked.
+    """
+
+    def __init__(self, log_file: str, salt: Optional[str] = None):
+        """
+        Args:
+            log_file (str): JSONL file the messages are appended to.
+            salt (Optional[str]): Secret mixed into the chat id hash. Defaults to a random salt that is
+                not written anywhere, so chat hashes are only stable for the lifetime of this recorder.
+        """
+        self.log_file = log_file
+        # Chat ids are small integers: without a secret salt their hashes could be brute-forced
+        self.salt = salt or secrets.token_hex(16)
+        self._lock = threading.Lock()
+
+    def anonymise_chat(self, chat_id) -> str:
+        return hashlib.sha256(f"{self.salt}:{chat_id}".encode('utf-8')).hexdigest()[:16]
+
+    @staticmethod
+    def scrub(text: str) -> str:
+        return _PHONE.sub("<phone>", _EMAIL.sub("<email>", text or ""))
+
+    def record(self, message):
+        entry = {
+            "ts": time.time(),
+            "chat": self.anonymise_chat(message.chat.id),
+            "text": self.scrub(message.text),
+        }
+        with self._lock:
+            with open(self.log_file, 'a', encoding='utf-8') as log:
+                log.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+def load_traffic(path: str) -> List[dict]:
+    with open(path, 'r', encoding='utf-8') as file:
+        records = [json.loads(line) for line in file if line.strip()]
+    return sorted(records, key=lambda record: record["ts"])
+
+
+def replay(bot, records: List[dict], speedup: float = 1.0, workers: int = 2) -> Dict[str, dict]:
+    """
+    Feeds recorded messages into TelegramBot.handle_message, preserving their relative arrival times.
+
+    Args:
+        bot (TelegramBot): Bot with its LLM handler set; replies are recorded instead of sent.
+        records (List[dict]): Messages from load_traffic.
+        speedup (float): Time compression factor (1.0 replays at the original arrival rate).
+        workers (int): Handler threads, like telebot's worker pool (TeleBot defaults to 2).
+
+    Returns:
+        Dict[str, dict]: Per-stage statistics as in benchmark.run_benchmark, plus 'queue_wait'
+            (time a message waited for a free worker) and the answer store hit rate.
+    """
+    tracer = CollectingTracer()
+    bot.tracer = tracer
+    bot.bot = RecordingSender()
+    if not records:
+        return {}
+
+    def handle(record, due):
+        started = time.perf_counter()
+        bot.handle_message(make_message(record["text"], chat_id=record["chat"]))
+        return started - due, time.perf_counter() - due
+
+    base_ts = records[0]["ts"]
+    wall_start = time.perf_counter()
+    futures = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for record in records:
+            due = wall_start + (record["ts"] - base_ts) / speedup
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            futures.append(executor.submit(handle, record, due))
+        timings = [future.result() for future in futures]
+    wall_time = time.perf_counter() - wall_start
+
+    stage_values = {"total": [end for _, end in timings], "queue_wait": [wait for wait, _ in timings]}
+    errors = 0
+    lookups = hits = 0
+    for record in tracer.records:
+        if record["error"]:
+            errors += 1
+        for name, duration in record["stages"].items():
+            stage_values.setdefault(name, []).append(duration)
+        if "answer_store_hit" in record["attributes"]:
+            lookups += 1
+            hits += record["attributes"]["answer_store_hit"]
+
+    report = {}
+    for name, values in stage_values.items():
+        report[name] = {
+            "count": len(values),
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "p99": percentile(values, 99),
+            "qps": len(values) / wall_time,
+        }
+    report["total"]["errors"] = errors
+    report["total"]["wall_time"] = wall_time
+    report["total"]["answer_store_hit_rate"] = hits / lookups if lookups else None
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded bot traffic against a stub LLM.")
+    parser.add_argument("traffic", help="JSONL log written by TrafficRecorder (TRAFFIC_LOG).")
+    parser.add_argument("--speedup", type=float, default=1.0, help="Time compression factor.")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--collection", default="taw_bio")
+    parser.add_argument("--db-path", default="DB/chroma_db")
+    parser.add_argument("--template", default="detailed_ar")
+    parser.add_argument("--latency", type=float, default=0.5, help="Simulated LLM latency in seconds.")
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--answer-store", help="Name of an AnswerStore collection to enable.")
+    parser.add_argument("--memory", action="store_true", help="Enable per-chat conversation memory.")
+    args = parser.parse_args()
+
+    from bot import TelegramBot
+    from llm import CustomLLM
+    from llm_handler import LLMHandler
+
+    stub = StubLLMServer(latency=args.latency, jitter=args.jitter).start()
+    llm = CustomLLM(stub.url)
+    llm.configure(auth_token="replay")
+    handler = LLMHandler(args.collection, args.db_path, llm, template_name=args.template)
+    if args.memory:
+        from conversation_memory import ConversationMemory
+        handler.memory = ConversationMemory()
+    if args.answer_store:
+        from answer_store import AnswerStore
+        handler.answer_store = AnswerStore(args.answer_store, args.db_path,
+                                           client=handler.chroma_interface.client,
+                                           embedding_function=handler.chroma_interface.embedding_function,
+                                           normalize=handler.chroma_interface.normalize)
+
+    bot = TelegramBot("0:replay")
+    bot.set_llm_handler(handler)
+    try:
+        result = replay(bot, load_traffic(args.traffic), args.speedup, args.workers)
+        print(format_report(result))
+        hit_rate = result.get("total", {}).get("answer_store_hit_rate")
+        if hit_rate is not None:
+            print(f"answer store hit rate: {hit_rate:.1%}")
+    finally:
+        stub.stop()